@@ -0,0 +1,266 @@
+#! /usr/bin/env python3.7
+"""Time several implementations of the same thing and compare them.
+
+Register each implementation with a Benchmark's candidate() decorator:
+
+    bench = Benchmark("Summing the squares of the first 1,000 integers")
+
+    @bench.candidate("for loop")
+    def using_for_loop():
+        ...
+
+    if __name__ == "__main__":
+        bench.main()
+
+Every candidate is called once and must return a result equal to the first
+candidate's. Each is then warmed up and timed 'repeat' times, and each
+timing calls it as many times in a row as it takes to fill 'min_time'
+seconds, so quick and slow candidates are both timed accurately. Times are
+reported per call, as the min (the best estimate of the cost of the code),
+the median and the standard deviation of the repeats.
+
+Results can be saved as JSON along with the Python version and machine they
+were measured on; to compare two saved runs:
+
+    python3 benchmark.py before.json after.json
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TextIO
+import argparse
+import datetime
+import json
+import operator
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+
+class Result(NamedTuple):
+    """The timings of one candidate: the calls per timing and the seconds per call of each timing."""
+
+    label: str
+    number: int
+    times: List[float]
+
+    @property
+    def min(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def stddev(self) -> float:
+        return statistics.stdev(self.times) if len(self.times) > 1 else 0.0
+
+
+class Candidate(NamedTuple):
+    label: str
+    function: Callable[[], Any]
+
+
+def calibrate(timer: timeit.Timer, min_time: float) -> int:
+    """Return how many calls in a row take at least min_time seconds."""
+    number = 1
+
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            return number
+
+        # aim a little past min_time, but at most 10 times as many calls at once
+        estimate = int(number * min_time * 1.2 / elapsed) if elapsed > 0 else number * 10
+        number = min(max(estimate, number + 1), number * 10)
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the Python and the machine the benchmark is running on."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "compiler": platform.python_compiler(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+class Benchmark:
+    """A set of candidate implementations to time against each other.
+
+    'equal' decides whether two candidates' results match; use, e.g.,
+    math.isclose for floating-point results summed in different orders."""
+
+    def __init__(self, title: str, equal: Callable[[Any, Any], bool] = operator.eq):
+        self.title = title
+        self.equal = equal
+        self.candidates: List[Candidate] = []
+
+    def candidate(self, label: Optional[str] = None) -> Callable:
+        """Register the decorated function, which takes no arguments, as a candidate.
+
+        The function is returned unchanged."""
+
+        def register(function: Callable[[], Any]) -> Callable[[], Any]:
+            self.candidates.append(Candidate(label or function.__name__, function))
+            return function
+
+        return register
+
+    def check(self) -> Any:
+        """Call every candidate once and return the result, raising ValueError unless they all match."""
+        if not self.candidates:
+            raise ValueError("There are no candidates to compare.")
+
+        expected = self.candidates[0].function()
+        mismatches = [
+            label for label, function in self.candidates[1:] if not self.equal(function(), expected)
+        ]
+
+        if mismatches:
+            raise ValueError(
+                f"Results of {', '.join(mismatches)} don't match {self.candidates[0].label}: {expected!r}."
+            )
+
+        return expected
+
+    def run(
+        self,
+        repeat: int = 5,
+        warmup: int = 1,
+        min_time: float = 0.2,
+        number: Optional[int] = None,
+        check: bool = True,
+    ) -> List[Result]:
+        """Time every candidate.
+
+        Keyword Arguments:
+            repeat {int} -- Timings of each candidate. (default: {5})
+            warmup {int} -- Untimed calls before the timings. (default: {1})
+            min_time {float} -- The shortest a timing may take, in seconds.
+            (default: {0.2})
+            number {int} -- Calls per timing; worked out from min_time if
+            None. (default: {None})
+            check {bool} -- Check the candidates' results first. (default: {True})
+
+        Returns:
+            list -- A Result for each candidate, in the order they were registered.
+
+        """
+        if check:
+            self.check()
+
+        results = []
+        for label, function in self.candidates:
+            for _ in range(warmup):
+                function()
+
+            timer = timeit.Timer(function)
+            calls = number or calibrate(timer, min_time)
+            times = [elapsed / calls for elapsed in timer.repeat(repeat, calls)]
+            results.append(Result(label, calls, times))
+
+        return results
+
+    def report(self, results: List[Result], out_file: TextIO = sys.stdout):
+        """Print the results as a table, with each candidate's min relative to the fastest."""
+        fastest = min(result.min for result in results)
+
+        print(file=out_file)
+        print(f"{self.title}...", file=out_file)
+        print(f"{'min':>11s} {'median':>11s} {'stddev':>11s} {'relative':>13s} {'calls':>10s}", file=out_file)
+        for result in results:
+            print(
+                f"{result.min:>11.4g} {result.median:>11.4g} {result.stddev:>11.4g} "
+                f"{result.min / fastest:>12,.2f}x {result.number:>10,d}  ({result.label})",
+                file=out_file,
+            )
+        print("(seconds per call)", file=out_file)
+
+    def save(self, file_name: str, results: List[Result], settings: Dict[str, Any]):
+        """Save the results, the settings they were measured with and the environment as JSON."""
+        with open(file_name, "w") as out_file:
+            json.dump(
+                {
+                    "title": self.title,
+                    "environment": environment(),
+                    "settings": settings,
+                    "results": [
+                        {
+                            "label": result.label,
+                            "number": result.number,
+                            "min": result.min,
+                            "median": result.median,
+                            "stddev": result.stddev,
+                            "times": result.times,
+                        }
+                        for result in results
+                    ],
+                },
+                out_file,
+                indent=2,
+            )
+
+    def main(self, argv: Optional[List[str]] = None):
+        """Run the benchmark with settings from the command line and print the results."""
+        parser = argparse.ArgumentParser(description=f"Benchmark: {self.title}.")
+        parser.add_argument("-r", "--repeat", type=int, default=5, help="timings of each candidate")
+        parser.add_argument("-w", "--warmup", type=int, default=1, help="untimed calls before timing")
+        parser.add_argument("-t", "--min-time", type=float, default=0.2, help="shortest timing, in seconds")
+        parser.add_argument("-n", "--number", type=int, help="calls per timing (default: calibrated)")
+        parser.add_argument("--no-check", action="store_true", help="don't check that the results match")
+        parser.add_argument("-j", "--json", help="save the results to this JSON file")
+        args = parser.parse_args(argv)
+
+        settings = {
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "min_time": args.min_time,
+            "number": args.number,
+        }
+        results = self.run(check=not args.no_check, **settings)
+        self.report(results)
+
+        if args.json:
+            self.save(args.json, results, settings)
+
+
+def load(file_name: str) -> Dict[str, Any]:
+    """Load results saved by Benchmark.save()."""
+    with open(file_name, "r") as in_file:
+        return json.load(in_file)
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], out_file: TextIO = sys.stdout):
+    """Print the min time of each candidate in two saved runs, and how many times faster the second is."""
+    for run in (before, after):
+        env = run["environment"]
+        print(f"{run['title']}: Python {env['python']} ({env['implementation']}) on {env['platform']}", file=out_file)
+
+    after_results = {result["label"]: result for result in after["results"]}
+
+    print(f"{'before':>11s} {'after':>11s} {'speedup':>9s}", file=out_file)
+    for result in before["results"]:
+        other = after_results.get(result["label"])
+        if other is None:
+            print(f"{result['min']:>11.4g} {'-':>11s} {'-':>9s}  ({result['label']})", file=out_file)
+        else:
+            speedup = result["min"] / other["min"]
+            print(f"{result['min']:>11.4g} {other['min']:>11.4g} {speedup:>8.2f}x  ({result['label']})", file=out_file)
+
+
+def main():
+    """Compare two saved benchmark runs."""
+    if len(sys.argv) != 3:
+        raise SystemExit(f"Usage: {sys.argv[0]} BEFORE.json AFTER.json")
+
+    compare(load(sys.argv[1]), load(sys.argv[2]))
+
+
+if __name__ == "__main__":
+    main()
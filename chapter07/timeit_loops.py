@@ -1,25 +1,31 @@
 #! /usr/bin/env python3.7
 
 import random
-import timeit
+
+from benchmark import Benchmark
 
 TAX_RATE = 0.08
 ITEMS = 100_000
 txns = [random.randrange(100) for _ in range(100_000)]
 
+bench = Benchmark(f"Comparing run times for calculating sales tax on {ITEMS:,} items")
+
 
 def get_price(txn):
     return txn * (1 + TAX_RATE)
 
 
+@bench.candidate("map()")
 def get_prices_with_map():
     return list(map(get_price, txns))
 
 
+@bench.candidate("list comprehension")
 def get_prices_with_comprehension():
     return [get_price(txn) for txn in txns]
 
 
+@bench.candidate("for loop")
 def get_prices_with_loop():
     prices = []
     for txn in txns:
@@ -28,19 +34,11 @@ def get_prices_with_loop():
 
 
 if __name__ == "__main__":
-    print()
-    print(f"Comparing run times for calculating sales tax on {ITEMS:,} items...")
-
-    with_map = timeit.timeit(get_prices_with_map, number=100)
-    print(f"{with_map:>.5f} seconds (map())")
-
-    with_comprehension = timeit.timeit(get_prices_with_comprehension, number=100)
-    print(f"{with_comprehension:>.5f} seconds (list comprehension)")
-
-    with_loop = timeit.timeit(get_prices_with_loop, number=100)
-    print(f"{with_loop:>.5f} seconds (for loop)")
+    bench.main()
 
     # Comparing run times for calculating sales tax on 100,000 items...
-    # 1.17696 seconds (map())
-    # 1.36382 seconds (list comprehension)
-    # 1.59123 seconds (for loop)
+    #         min      median      stddev      relative      calls
+    #     0.01648     0.01808    0.002606         1.06x         10  (map())
+    #     0.01618     0.01652   0.0003738         1.04x         14  (list comprehension)
+    #     0.01559     0.01798    0.001445         1.00x         15  (for loop)
+    # (seconds per call)
@@ -1,18 +1,39 @@
 #! /usr/bin/env python3.7
 
-import timeit
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from benchmark import Benchmark
+
+try:
+    import numpy as np
+except ImportError:  # the NumPy candidates are skipped if it isn't installed
+    np = None
 
 COUNT = 10_000_000
 
+# the most squares that can be added up as int64 without overflowing; the
+# sum of all of them (about 3.3e20) doesn't fit in an int64, but each of
+# them (at most about 1e14) does
+INT64_MAX = 2 ** 63 - 1
+SAFE_CHUNK = max(1, INT64_MAX // max(1, (COUNT - 1) ** 2))
+
+WORKERS = os.cpu_count() or 1
+
+bench = Benchmark(f"Summing the squares of the first {COUNT:,} integers")
 
+
+@bench.candidate("map()")
 def using_map():
     return sum(map(lambda i: i * i, range(COUNT)))
 
 
+@bench.candidate("list comprehension")
 def using_comprehension():
     return sum([i * i for i in range(COUNT)])
 
 
+@bench.candidate("for loop")
 def using_for_loop():
     sum_ = 0
     for i in range(COUNT):
@@ -20,34 +41,59 @@ def using_for_loop():
     return sum_
 
 
+@bench.candidate("generator")
 def using_generator():
     return sum(i * i for i in range(COUNT))
 
 
-if __name__ == "__main__":
-    print()
-    print(f"Summing the squares of the first {COUNT:,} integers...")
+def sum_squares(start, stop):
+    sum_ = 0
+    for i in range(start, stop):
+        sum_ += i * i
+    return sum_
+
+
+@bench.candidate(f"{WORKERS} process(es)")
+def using_processes():
+    bounds = [COUNT * worker // WORKERS for worker in range(WORKERS + 1)]
+    with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+        return sum(pool.map(sum_squares, bounds[:-1], bounds[1:]))
+
 
-    with_map = timeit.timeit(using_map, number=100)
-    print(f"{with_map:>.5f} seconds (map())")
+if np is not None:
 
-    with_comprehension = timeit.timeit(using_comprehension, number=100)
-    print(f"{with_comprehension:>.5f} seconds (list comprehension)")
+    @bench.candidate("NumPy")
+    def using_numpy():
+        squares = np.arange(COUNT, dtype=np.int64) ** 2
+        # add up SAFE_CHUNK squares at a time in int64, then the chunks' sums as Python ints
+        sums = np.add.reduceat(squares, np.arange(0, COUNT, SAFE_CHUNK))
+        return sum(sums.tolist())
 
-    with_loop = timeit.timeit(using_for_loop, number=100)
-    print(f"{with_loop:>.5f} seconds (for loop)")
+    @bench.candidate("chunked NumPy")
+    def using_numpy_chunks():
+        sum_ = 0
+        for start in range(0, COUNT, SAFE_CHUNK):
+            chunk = np.arange(start, min(start + SAFE_CHUNK, COUNT), dtype=np.int64)
+            sum_ += int(np.dot(chunk, chunk))
+        return sum_
 
-    with_generator = timeit.timeit(using_generator, number=100)
-    print(f"{with_generator:>.5f} seconds (generator)")
 
-    # Summing the squares of the first 1,000,000 integers...
-    # 6.58681 seconds (map())
-    # 7.93916 seconds (list comprehension)
-    # 5.44238 seconds (for loop)
-    # 5.18300 seconds (generator)
+@bench.candidate("closed form")
+def using_formula():
+    return COUNT * (COUNT - 1) * (2 * COUNT - 1) // 6
+
+
+if __name__ == "__main__":
+    bench.main()
 
     # Summing the squares of the first 10,000,000 integers...
-    # 76.48243 seconds (map())
-    # 108.90998 seconds (list comprehension)
-    # 60.98440 seconds (for loop)
-    # 61.87536 seconds (generator)
+    #         min      median      stddev      relative      calls
+    #       1.079       1.341      0.1489 3,869,990.26x          1  (map())
+    #       1.083       1.109     0.04301 3,886,885.85x          1  (list comprehension)
+    #      0.9112       1.031     0.05301 3,269,053.85x          1  (for loop)
+    #       1.046        1.12     0.05011 3,754,208.83x          1  (generator)
+    #      0.8792      0.9001     0.05475 3,153,985.79x          1  (1 process(es))
+    #     0.04848     0.05078    0.001766   173,929.81x          4  (NumPy)
+    #     0.01738     0.01765   0.0002055    62,334.18x         13  (chunked NumPy)
+    #   2.787e-07   3.186e-07    2.21e-08         1.00x    966,843  (closed form)
+    # (seconds per call, with NumPy 2.4)
@@ -1,7 +1,31 @@
 #! /usr/bin/env python3.8
 """Calculate weighted grades."""
 
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+import argparse
+import csv
+import functools
+import itertools
+import json
+import math
+import operator
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # fall back to plain Python if NumPy isn't installed
+    np = None
+
+# lines of the grade file graded at a time in batch mode
+CHUNK_SIZE = 100_000
+
+# the lowest grade earning each letter, highest first
+LETTER_GRADES = ((90.0, "A"), (80.0, "B"), (70.0, "C"), (60.0, "D"), (-math.inf, "F"))
+
+# the percentiles reported by --stats
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
 
 
 def weighted_grade(
@@ -36,42 +60,843 @@ def parse_line(line: str) -> Tuple[str, List[float]]:
     """Parse student info.
 
     Given a string containing a student's name and their grades return a tuple
-    containing their information.
+    containing their information. Fields may be padded with spaces, and a
+    name containing a comma may be quoted, e.g., "Hulk, Jr.", Hogan, 90, 85, 70.
 
     Arguments:
         line {str} -- The student's name.
         List {float} -- The studen't grades.
 
+    Raises:
+        ValueError -- If the line doesn't have a name and numeric scores.
+
     Returns:
         Tuple -- A tuple containing the student's name and a list of their
         grades.
     """
-    fields: List[str] = line.strip().split(",")
-    name: str = fields[1] + " " + fields[0]
-    scores: List = []
+    fields: List[str] = line.split(",")
+
+    # the usual line, unquoted with finite scores, is parsed right here
+    if len(fields) > 2 and '"' not in line:
+        scores: List[float] = []
+        try:
+            for element in fields[2:]:
+                score = float(element)
+                if not math.isfinite(score):
+                    break
+                scores.append(score)
+            else:
+                return f"{fields[1].strip()} {fields[0].strip()}", scores
+        except ValueError:
+            pass
+
+    return _parse_fields(_split_line(line))
+
+
+def _split_line(line: str) -> List[str]:
+    """Split one line into its fields, reading quoted fields with the csv module."""
+    if '"' in line:
+        return next(csv.reader([line], skipinitialspace=True), [])
+    return line.split(",")
+
+
+def _parse_fields(fields: List[str]) -> Tuple[str, List[float]]:
+    """Turn the fields of one line into a name and a list of scores, raising ValueError if they can't be."""
+    if len(fields) < 3:
+        raise ValueError("Expected a last name, a first name and at least one score.")
+
+    name: str = f"{fields[1].strip()} {fields[0].strip()}"
 
     # gather the scores, now strings, as a list of floats
-    for element in fields[2:]:
-        scores.append(float(element))
+    try:
+        scores: List[float] = list(map(float, fields[2:]))
+    except ValueError:
+        bad = next(element for element in fields[2:] if not _is_number(element))
+        raise ValueError(f"Score {bad.strip()!r} is not a number.") from None
+
+    if not all(map(math.isfinite, scores)):
+        raise ValueError("Scores must be finite numbers.")
 
     return name, scores
 
 
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+class LineError(NamedTuple):
+    """A line of the grade file that couldn't be graded, and why."""
+
+    line_number: int
+    line: str
+    reason: str
+
+
+def parse_lines(
+    lines: Iterable[str], first_line_number: int = 1, assessments: Optional[int] = None
+) -> Tuple[List[Tuple[str, Tuple[float, ...]]], List[LineError]]:
+    """Parse many lines, setting aside the ones that can't be parsed instead of stopping.
+
+    Arguments:
+        lines {list} -- Lines of the grade file. Blank lines are skipped.
+
+    Keyword Arguments:
+        first_line_number {int} -- The line number of the first line, for
+        the error report. (default: {1})
+        assessments {int} -- The number of scores each student must have;
+        any number if None. (default: {None})
+
+    Returns:
+        tuple -- The (name, scores) tuple of each good line, with the scores
+        as a tuple, and a LineError for each bad one.
+
+    """
+    if not isinstance(lines, list):
+        lines = list(lines)
+
+    students: List[Tuple[str, Tuple[float, ...]]] = []
+    errors: List[LineError] = []
+    append = students.append
+    fields_per_line = -1 if assessments is None else assessments + 2
+
+    def parse_slowly(index: int, fields: List[str]) -> bool:
+        """Parse the fields of lines[index], returning whether the student was added."""
+        line = lines[index]
+        if not line or line.isspace():
+            return False
+
+        try:
+            name, scores = _parse_fields(fields)
+        except ValueError as err:
+            errors.append(LineError(first_line_number + index, line.rstrip("\r\n"), str(err)))
+            return False
+
+        if assessments is not None and len(scores) != assessments:
+            reason = f"Expected {assessments} scores, found {len(scores)}."
+            errors.append(LineError(first_line_number + index, line.rstrip("\r\n"), reason))
+            return False
+
+        append((name, tuple(scores)))
+        return True
+
+    reader = csv.reader(lines, skipinitialspace=True)
+    rows_not_added = 0
+
+    try:
+        for fields in reader:
+            if len(fields) == fields_per_line:
+                # a tuple of floats, unlike a list, drops out of the garbage collector's sight
+                try:
+                    append((f"{fields[1].strip()} {fields[0].strip()}", tuple(map(float, fields[2:]))))
+                    continue
+                except ValueError:
+                    pass
+
+            # the row's line, as long as every row so far was one line
+            if not parse_slowly(reader.line_num - 1, fields):
+                rows_not_added += 1
+        one_line_rows = reader.line_num == len(students) + rows_not_added
+    except csv.Error:
+        one_line_rows = False
+
+    all_scores = itertools.chain.from_iterable(map(operator.itemgetter(1), students))
+    if not one_line_rows or not all(map(math.isfinite, all_scores)):
+        # an open quote ran on into the following lines, the reader gave
+        # up, or some scores aren't finite; start over, one line at a time
+        students.clear()
+        errors.clear()
+        for index, line in enumerate(lines):
+            parse_slowly(index, _split_line(line))
+
+    return students, errors
+
+
+class Category(NamedTuple):
+    """A group of assessments, e.g., homework, that counts for part of the grade."""
+
+    name: str
+    weight: float
+    columns: Tuple[int, ...]
+    drop_lowest: int = 0
+
+
+class GradingScheme(NamedTuple):
+    """How to turn any number of scores into a grade.
+
+    Each category's grade is the mean of its scores, leaving out its lowest
+    drop_lowest scores, and the final grade is the sum of each category's
+    grade times its weight. Build one with compile_scheme() or load_scheme()
+    and use it for every student."""
+
+    assessments: int
+    categories: Tuple[Category, ...]
+
+    def grade(self, scores: Sequence[float]) -> float:
+        """Calculate one student's grade.
+
+        Arguments:
+            scores {list} -- The student's scores, one per assessment.
+
+        Returns:
+            float -- The computed weighted grade.
+
+        """
+        if len(scores) != self.assessments:
+            raise ValueError(f"You must provide exactly {self.assessments} scores.")
+
+        grade = 0.0
+        for category in self.categories:
+            kept = sorted(scores[column] for column in category.columns)[category.drop_lowest :]
+
+            # added one at a time, lowest first, as grade_matrix() adds them
+            total = 0.0
+            for score in kept:
+                total += score
+            grade += category.weight * (total / len(kept))
+
+        return grade
+
+    def grade_matrix(self, scores_matrix):
+        """Calculate the grades of many students at once with NumPy.
+
+        Each category's scores are sorted and added up a column at a time,
+        in the same order grade() adds them, so the grades are exactly the
+        same as its grades.
+
+        Arguments:
+            scores_matrix {numpy.ndarray} -- One row of scores per student.
+
+        Returns:
+            numpy.ndarray -- The computed weighted grade of each student.
+
+        """
+        grades = np.zeros(scores_matrix.shape[0])
+
+        for category in self.categories:
+            kept = np.sort(scores_matrix[:, category.columns], axis=1)[:, category.drop_lowest :]
+
+            total = np.zeros(scores_matrix.shape[0])
+            for column in range(kept.shape[1]):
+                total += kept[:, column]
+            grades += category.weight * (total / kept.shape[1])
+
+        return grades
+
+
+def compile_scheme(categories: Dict[str, Dict], assessments: Optional[int] = None) -> GradingScheme:
+    """Check a description of a grading scheme and turn it into a GradingScheme.
+
+    The description maps each category name to its weight, the positions
+    (counting from 0) of its assessments among a student's scores, and
+    optionally how many of its lowest scores to drop, e.g.:
+
+        {"homework": {"weight": 0.4, "assessments": [0, 1, 2, 3], "drop_lowest": 1},
+         "exams": {"weight": 0.6, "assessments": [4, 5]}}
+
+    Arguments:
+        categories {dict} -- The description of each category.
+
+    Keyword Arguments:
+        assessments {int} -- How many scores each student has. (default: {one
+        more than the highest position used})
+
+    Returns:
+        GradingScheme -- The compiled scheme.
+
+    """
+    compiled = []
+    used: Dict[int, str] = {}
+
+    for name, category in categories.items():
+        columns = tuple(int(column) for column in category["assessments"])
+        drop_lowest = int(category.get("drop_lowest", 0))
+
+        if not columns:
+            raise ValueError(f"Category {name} has no assessments.")
+        if not 0 <= drop_lowest < len(columns):
+            raise ValueError(f"Category {name} must keep at least one of its {len(columns)} scores.")
+        for column in columns:
+            if column < 0:
+                raise ValueError(f"Category {name} has a negative assessment position.")
+            if column in used:
+                raise ValueError(f"Assessment {column} is in both {used[column]} and {name}.")
+            used[column] = name
+
+        compiled.append(Category(name, float(category["weight"]), columns, drop_lowest))
+
+    if not compiled:
+        raise ValueError("A grading scheme needs at least one category.")
+
+    if assessments is None:
+        assessments = max(used) + 1
+    elif max(used) >= assessments:
+        raise ValueError(f"Assessment {max(used)} is past the last of {assessments} assessments.")
+
+    return GradingScheme(assessments, tuple(compiled))
+
+
+def load_scheme(file_name: str) -> GradingScheme:
+    """Read a grading scheme from a JSON file in the format compile_scheme() takes.
+
+    The file may also hold an "assessments" count next to the categories:
+    {"assessments": 22, "categories": {...}}.
+    """
+    with open(file_name, "r") as scheme_file:
+        description = json.load(scheme_file)
+
+    if "categories" in description:
+        return compile_scheme(description["categories"], description.get("assessments"))
+    return compile_scheme(description)
+
+
+def grade_chunk(
+    lines: Sequence[str],
+    weights: Tuple[float, float, float] = (0.3, 0.3, 0.4),
+    scheme: Optional[GradingScheme] = None,
+    errors: Optional[List[LineError]] = None,
+    first_line_number: int = 1,
+) -> List[Tuple[str, float]]:
+    """Calculate the weighted grades of many students at once.
+
+    The scores are put in a matrix with one row per student and multiplied
+    by the weights a column at a time, in the same order weighted_grade()
+    adds them up, so the grades are exactly the same as its grades.
+
+    Arguments:
+        lines {list} -- Lines of the grade file. Blank lines are skipped.
+
+    Keyword Arguments:
+        weights {tuple} -- The weights applied to each of the scores.
+        (default: {(0.3, 0.3, 0.4)})
+        scheme {GradingScheme} -- Grade with this scheme instead of the
+        weights. (default: {None})
+        errors {list} -- Append a LineError here for each line that can't
+        be graded; if None, the first such line raises ValueError.
+        (default: {None})
+        first_line_number {int} -- The line number of the first line.
+        (default: {1})
+
+    Returns:
+        list -- A (name, grade) tuple for each student.
+
+    """
+    if scheme is None and len(weights) != 3:
+        raise ValueError("You must provide exactly three values to weigh the scores by.")
+
+    assessments = 3 if scheme is None else scheme.assessments
+    students, bad_lines = parse_lines(lines, first_line_number, assessments)
+
+    if bad_lines:
+        if errors is None:
+            raise ValueError(f"Line {bad_lines[0].line_number}: {bad_lines[0].reason}")
+        errors.extend(bad_lines)
+
+    if scheme is not None:
+        if np is None:
+            return [(name, scheme.grade(scores)) for name, scores in students]
+
+        scores_matrix = _scores_matrix(students, scheme.assessments)
+        return list(zip(map(operator.itemgetter(0), students), scheme.grade_matrix(scores_matrix).tolist()))
+
+    if np is None:
+        return [(name, weighted_grade(scores, weights)) for name, scores in students]
+
+    scores_matrix = _scores_matrix(students, 3)
+
+    grades = scores_matrix[:, 0] * weights[0]
+    for column in range(1, 3):
+        grades = grades + scores_matrix[:, column] * weights[column]
+
+    return list(zip(map(operator.itemgetter(0), students), grades.tolist()))
+
+
+def _scores_matrix(students: List[Tuple[str, Sequence[float]]], assessments: int):
+    """Put the students' scores in a NumPy matrix with one row per student."""
+    scores = itertools.chain.from_iterable(map(operator.itemgetter(1), students))
+    return np.fromiter(scores, dtype=np.float64, count=len(students) * assessments).reshape(-1, assessments)
+
+
+def read_chunks(grade_file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[List[str]]:
+    """Read the grade file a list of chunk_size lines at a time.
+
+    Arguments:
+        grade_file {file} -- The open grade file.
+
+    Keyword Arguments:
+        chunk_size {int} -- The most lines in each list. (default: {CHUNK_SIZE})
+
+    Returns:
+        iterator -- Lists of lines.
+
+    """
+    while True:
+        chunk = list(itertools.islice(grade_file, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_bounded(pool: ProcessPoolExecutor, function: Callable, items: Iterable, window: int) -> Iterator:
+    """Like pool.map(), but with at most 'window' items submitted at a time.
+
+    pool.map() submits every item before returning the first result, so
+    mapping over the chunks of a file would read the whole file into the
+    queue. This reads only as far ahead as the window, and still yields the
+    results in order.
+
+    Arguments:
+        pool {ProcessPoolExecutor} -- The pool to run function in.
+        function {callable} -- Called with each item.
+        items {iterable} -- The items, read lazily.
+        window {int} -- The most items submitted but not yet yielded.
+
+    Returns:
+        iterator -- function's result for each item, in order.
+
+    """
+    pending: deque = deque()
+
+    for item in items:
+        pending.append(pool.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def _numbered_chunks(grade_file: TextIO, chunk_size: int) -> Iterator[Tuple[int, List[str]]]:
+    """Read the grade file in chunks, each with the line number of its first line."""
+    for index, chunk in enumerate(read_chunks(grade_file, chunk_size)):
+        yield index * chunk_size + 1, chunk
+
+
+def _grade_numbered_chunk(
+    job: Tuple[int, List[str]], scheme: Optional[GradingScheme] = None
+) -> Tuple[List[Tuple[str, float]], List[LineError]]:
+    """Grade a chunk from _numbered_chunks(), returning its grades and its bad lines."""
+    first_line_number, lines = job
+    errors: List[LineError] = []
+    grades = grade_chunk(lines, scheme=scheme, errors=errors, first_line_number=first_line_number)
+    return grades, errors
+
+
+def _collect_errors(chunk_errors: List[LineError], errors: Optional[List[LineError]]):
+    """Add a chunk's bad lines to errors, or raise ValueError for the first one if errors is None."""
+    if not chunk_errors:
+        return
+    if errors is None:
+        raise ValueError(f"Line {chunk_errors[0].line_number}: {chunk_errors[0].reason}")
+    errors.extend(chunk_errors)
+
+
+def grade_students(
+    grade_file: TextIO,
+    chunk_size: int = CHUNK_SIZE,
+    workers: Optional[int] = None,
+    scheme: Optional[GradingScheme] = None,
+    errors: Optional[List[LineError]] = None,
+) -> Iterator[Tuple[str, float]]:
+    """Grade every student in a file, a chunk of lines at a time.
+
+    Arguments:
+        grade_file {file} -- The open grade file.
+
+    Keyword Arguments:
+        chunk_size {int} -- Lines graded at a time. (default: {CHUNK_SIZE})
+        workers {int} -- Processes to grade chunks in; with None or 1 the
+        chunks are graded in this process. (default: {None})
+        scheme {GradingScheme} -- Grade with this scheme instead of the
+        default three weights. (default: {None})
+        errors {list} -- Append a LineError here for each line that can't
+        be graded and carry on; if None, the first such line raises
+        ValueError. (default: {None})
+
+    Returns:
+        iterator -- A (name, grade) tuple for each student, in file order.
+
+    """
+    chunks = _numbered_chunks(grade_file, chunk_size)
+    grade = functools.partial(_grade_numbered_chunk, scheme=scheme)
+
+    if workers is None or workers == 1:
+        for chunk in chunks:
+            grades, chunk_errors = grade(chunk)
+            _collect_errors(chunk_errors, errors)
+            yield from grades
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for grades, chunk_errors in map_bounded(pool, grade, chunks, 2 * workers):
+            _collect_errors(chunk_errors, errors)
+            yield from grades
+
+
+class RunningMoments:
+    """The count, mean, variance, minimum and maximum of a stream of numbers.
+
+    Uses Welford's method, so the numbers are seen once and never stored.
+    Two RunningMoments over different numbers can be merged into the moments
+    of all of them, the same (up to rounding) as if one had seen them all."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # the sum of squared differences from the mean
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value: float):
+        """Add one number."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other: "RunningMoments"):
+        """Add all of the numbers another RunningMoments has seen."""
+        if not other.count:
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def variance(self, sample: bool = False) -> float:
+        """Return the population variance, or the sample variance if sample is True."""
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1 if sample else self.count)
+
+    def stddev(self, sample: bool = False) -> float:
+        """Return the population (or sample) standard deviation."""
+        return math.sqrt(self.variance(sample))
+
+
+class QuantileSketch:
+    """Estimate percentiles of a stream of numbers in a fixed amount of memory.
+
+    Each number is counted in a bucket whose bounds grow geometrically, so
+    every percentile returned is within 'accuracy' (a fraction) of the true
+    value: with the default of 0.005, a median of 80 comes back as something
+    between 79.6 and 80.4. Numbers from 0.01 to 100 fit in under 1,000
+    buckets. Sketches with the same accuracy merge exactly by adding bucket
+    counts, so chunks can be sketched separately, even in other processes."""
+
+    # numbers closer to 0 than this are counted as 0
+    MIN_VALUE = 1e-9
+
+    def __init__(self, accuracy: float = 0.005):
+        if not 0 < accuracy < 1:
+            raise ValueError("The accuracy must be between 0 and 1.")
+
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _bucket(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, bucket: int) -> float:
+        # the point of the bucket that is within 'accuracy' of all of it
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value: float):
+        """Add one number."""
+        self.count += 1
+
+        if value > self.MIN_VALUE:
+            bucket = self._bucket(value)
+            self.positive[bucket] = self.positive.get(bucket, 0) + 1
+        elif value < -self.MIN_VALUE:
+            bucket = self._bucket(-value)
+            self.negative[bucket] = self.negative.get(bucket, 0) + 1
+        else:
+            self.zeros += 1
+
+    def merge(self, other: "QuantileSketch"):
+        """Add all of the numbers another sketch has seen."""
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same accuracy can be merged.")
+
+        for buckets, other_buckets in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, count in other_buckets.items():
+                buckets[bucket] = buckets.get(bucket, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, fraction: float) -> float:
+        """Return the estimated value below which 'fraction' (0 to 1) of the numbers fall.
+
+        This estimates the number at position fraction * (count - 1) of the
+        numbers in sorted order."""
+        if not self.count:
+            raise ValueError("The sketch is empty.")
+        if not 0 <= fraction <= 1:
+            raise ValueError("The fraction must be between 0 and 1.")
+
+        rank = int(fraction * (self.count - 1))
+        seen = 0
+
+        # the most negative numbers are in the highest negative buckets
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return -self._value(bucket)
+
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return self._value(bucket)
+
+        return self._value(max(self.positive))
+
+
+def letter_grade(grade: float) -> str:
+    """Return the letter earned by a grade."""
+    for lowest, letter in LETTER_GRADES:
+        if grade >= lowest:
+            return letter
+    return LETTER_GRADES[-1][1]
+
+
+class GradeStatistics:
+    """Class-level statistics of a stream of grades: moments, percentiles and a letter-grade histogram.
+
+    Partial statistics, e.g., of each chunk of a file, combine with merge()."""
+
+    def __init__(self, accuracy: float = 0.005):
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(accuracy)
+        self.letters: Counter = Counter()
+
+    def add(self, grade: float):
+        """Add one student's grade."""
+        self.moments.add(grade)
+        self.sketch.add(grade)
+        self.letters[letter_grade(grade)] += 1
+
+    def add_student(self, student: Tuple[str, Sequence[float]], scheme: Optional[GradingScheme] = None):
+        """Grade a (name, scores) tuple, as returned by parse_line(), and add the grade."""
+        _, scores = student
+        self.add(weighted_grade(scores) if scheme is None else scheme.grade(scores))
+
+    def merge(self, other: "GradeStatistics"):
+        """Add all of the grades another GradeStatistics has seen."""
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        self.letters.update(other.letters)
+
+    def report(self, out_file: TextIO = sys.stdout):
+        """Print the statistics."""
+        moments = self.moments
+        print(f"{'Students':>13s} {moments.count:14,d}", file=out_file)
+        if not moments.count:
+            return
+
+        print(f"{'Mean':>13s} {moments.mean:14.2f}", file=out_file)
+        print(f"{'Std. dev.':>13s} {moments.stddev():14.2f}", file=out_file)
+        print(f"{'Minimum':>13s} {moments.minimum:14.2f}", file=out_file)
+        for fraction in PERCENTILES:
+            label = f"{fraction * 100:g}th pct."
+            value = min(max(self.sketch.quantile(fraction), moments.minimum), moments.maximum)
+            print(f"{label:>13s} {value:14.2f}", file=out_file)
+        print(f"{'Maximum':>13s} {moments.maximum:14.2f}", file=out_file)
+        print(f"(percentiles are within {self.sketch.accuracy:.1%} of the exact values)", file=out_file)
+
+        print(file=out_file)
+        tallest = max(self.letters.values())
+        for _, letter in LETTER_GRADES:
+            count = self.letters[letter]
+            bar = "#" * round(40 * count / tallest)
+            print(f"{letter:>3s} {count:10,d} {count / moments.count:7.1%}  {bar}", file=out_file)
+
+
+def chunk_statistics(
+    lines: Sequence[str],
+    scheme: Optional[GradingScheme] = None,
+    errors: Optional[List[LineError]] = None,
+    first_line_number: int = 1,
+) -> GradeStatistics:
+    """Grade a chunk of lines of the grade file and return the statistics of the grades.
+
+    Bad lines are handled as grade_chunk() handles them."""
+    statistics = GradeStatistics()
+    for _, grade in grade_chunk(lines, scheme=scheme, errors=errors, first_line_number=first_line_number):
+        statistics.add(grade)
+    return statistics
+
+
+def _summarize_numbered_chunk(
+    job: Tuple[int, List[str]], scheme: Optional[GradingScheme] = None
+) -> Tuple[GradeStatistics, List[LineError]]:
+    """Summarize a chunk from _numbered_chunks(), returning its statistics and its bad lines."""
+    first_line_number, lines = job
+    errors: List[LineError] = []
+    return chunk_statistics(lines, scheme, errors, first_line_number), errors
+
+
+def grade_statistics(
+    grade_file: TextIO,
+    chunk_size: int = CHUNK_SIZE,
+    workers: Optional[int] = None,
+    scheme: Optional[GradingScheme] = None,
+    errors: Optional[List[LineError]] = None,
+) -> GradeStatistics:
+    """Compute the statistics of every student's grade in one pass over the file.
+
+    Arguments:
+        grade_file {file} -- The open grade file.
+
+    Keyword Arguments:
+        chunk_size {int} -- Lines graded at a time. (default: {CHUNK_SIZE})
+        workers {int} -- Processes to grade chunks in; each sends back only
+        the statistics of its chunk. (default: {None})
+        scheme {GradingScheme} -- Grade with this scheme instead of the
+        default three weights. (default: {None})
+        errors {list} -- Append a LineError here for each line that can't
+        be graded and carry on; if None, the first such line raises
+        ValueError. (default: {None})
+
+    Returns:
+        GradeStatistics -- The merged statistics of all of the chunks.
+
+    """
+    chunks = _numbered_chunks(grade_file, chunk_size)
+    summarize = functools.partial(_summarize_numbered_chunk, scheme=scheme)
+    statistics = GradeStatistics()
+
+    if workers is None or workers == 1:
+        for chunk in chunks:
+            partial, chunk_errors = summarize(chunk)
+            _collect_errors(chunk_errors, errors)
+            statistics.merge(partial)
+        return statistics
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial, chunk_errors in map_bounded(pool, summarize, chunks, 2 * workers):
+            _collect_errors(chunk_errors, errors)
+            statistics.merge(partial)
+
+    return statistics
+
+
+def print_grades(grades: Iterable[Tuple[str, float]], out_file: TextIO = sys.stdout):
+    """Print the grades as a table, just as main() does."""
+    print(f"{'Name':>13s}  {'Grade':>15s}", file=out_file)
+    print("-" * 30, file=out_file)
+
+    for name, grade in grades:
+        print(f"{name:>15s} {grade:14.2f}", file=out_file)
+
+
+def write_grades(grades: Iterable[Tuple[str, float]], out_file: TextIO):
+    """Write the grades to a CSV file with name and grade columns."""
+    writer = csv.writer(out_file)
+    writer.writerow(["name", "grade"])
+
+    for name, grade in grades:
+        writer.writerow([name.strip(), f"{grade:.2f}"])
+
+
+def write_errors(errors: Iterable[LineError], out_file: TextIO):
+    """Write the error report: a CSV file with the line number, the line itself and the reason."""
+    writer = csv.writer(out_file)
+    writer.writerow(LineError._fields)
+    writer.writerows(errors)
+
+
+def report_errors(errors: List[LineError], error_file: Optional[str] = None):
+    """Save the bad lines to error_file, or list them on standard error if it is None."""
+    if error_file:
+        with open(error_file, "w", newline="") as out_file:
+            write_errors(errors, out_file)
+    else:
+        for error in errors:
+            print(f"Line {error.line_number}: {error.reason} {error.line!r}", file=sys.stderr)
+
+    if errors:
+        print(f"{len(errors):,} line(s) could not be graded and were skipped.", file=sys.stderr)
+
+
+def run_batch(argv: List[str]):
+    """Grade the file named on the command line without asking any questions."""
+    parser = argparse.ArgumentParser(description="Calculate weighted grades for every student in a file.")
+    parser.add_argument("file", help="grade file, one 'last, first, score, score, score' line per student")
+    parser.add_argument("-o", "--output", help="file to write to (default: standard output)")
+    parser.add_argument("-f", "--format", choices=["csv", "table"], default="csv", help="output format")
+    parser.add_argument("-w", "--workers", type=int, help="processes to grade with (default: 1)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=CHUNK_SIZE, help="lines graded at a time")
+    parser.add_argument("-s", "--scheme", help="JSON grading scheme (default: three scores weighted 0.3, 0.3, 0.4)")
+    parser.add_argument("--stats", action="store_true", help="print class statistics instead of each grade")
+    parser.add_argument("-e", "--errors", help="CSV file for the lines that can't be graded (default: standard error)")
+    args = parser.parse_args(argv)
+
+    scheme = load_scheme(args.scheme) if args.scheme else None
+    errors: List[LineError] = []
+
+    if args.stats:
+        with open(args.file, "r") as in_file:
+            statistics = grade_statistics(in_file, args.chunk_size, args.workers, scheme, errors)
+        if args.output:
+            with open(args.output, "w") as out_file:
+                statistics.report(out_file)
+        else:
+            statistics.report()
+    else:
+        write = write_grades if args.format == "csv" else print_grades
+
+        with open(args.file, "r") as in_file:
+            grades = grade_students(in_file, args.chunk_size, args.workers, scheme, errors)
+            if args.output:
+                with open(args.output, "w", newline="") as out_file:
+                    write(grades, out_file)
+            else:
+                write(grades, sys.stdout)
+
+    report_errors(errors, args.errors)
+
+
 def main():
     """Get a line from the file, print the final grade nicely."""
+    if len(sys.argv) > 1:
+        run_batch(sys.argv[1:])
+        return
+
     file_name: str = input("Open what file? ")
 
     with open(file_name, "r") as grade_file:
         print(f"{'Name':>13s}  {'Grade':>15s}")
         print("-" * 30)
 
-        name: str = ""
-        scores: List[float] = []
+        errors: List[LineError] = []
+
+        for first_line_number, chunk in _numbered_chunks(grade_file, CHUNK_SIZE):
+            students, bad_lines = parse_lines(chunk, first_line_number, assessments=3)
+            errors.extend(bad_lines)
+
+            for name, scores in students:
+                print(f"{name:>15s} {weighted_grade(scores):14.2f}")
 
-        for line in grade_file:
-            name, scores = parse_line(line)
-            grade = weighted_grade(scores)
-            print(f"{name:>15s} {grade:14.2f}")
+    report_errors(errors)
 
 
 if __name__ == "__main__":
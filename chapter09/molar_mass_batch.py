@@ -0,0 +1,162 @@
+#! /usr/bin/env python3.8
+"""Compute the molar masses of a whole file of chemical formulas.
+
+Formulas are read a batch at a time. Each distinct formula in a batch is
+parsed once and turned into element counts indexed by atomic number; the
+counts of the whole batch are then multiplied by the atomic masses and
+added up per formula in a few NumPy operations. Results stream out to a CSV file, with an
+error column for formulas that cannot be parsed instead of stopping.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+import argparse
+import csv
+import itertools
+import sys
+
+import periodic_table
+
+try:
+    import numpy as np
+except ImportError:  # fall back to plain Python if NumPy isn't installed
+    np = None
+
+BATCH_SIZE = 10_000
+
+# the most distinct formulas remembered between batches
+KNOWN_LIMIT = 1_000_000
+
+
+def read_formulas(in_file: TextIO, column: Optional[str] = None) -> Iterator[str]:
+    """Return an iterator over the formulas in a file.
+
+    With no column, each non-blank line is a formula. Otherwise the file is
+    a CSV with a header row and the formulas are in the named column (or
+    numbered column, counting from 0, if no column has that name). The
+    header is read right away, so a ValueError for a missing column is
+    raised by this call rather than while iterating."""
+    if column is None:
+        return (line for line in map(str.strip, in_file) if line)
+
+    reader = csv.reader(in_file)
+    header = next(reader, [])
+
+    if column in header:
+        index = header.index(column)
+    elif column.isdigit() and int(column) < len(header):
+        index = int(column)
+    else:
+        raise ValueError(f"No column {column!r} in the header: {', '.join(header)}.")
+
+    return (row[index].strip() for row in reader if len(row) > index)
+
+
+def compute_weights(
+    formulas: List[str], table: periodic_table.PeriodicTable
+) -> Dict[str, Tuple[Optional[float], str]]:
+    """Compute the molar mass of each distinct formula.
+
+    Returns a dictionary mapping each formula to its weight and an empty
+    error message, or to None and the reason it could not be parsed."""
+    results: Dict[str, Tuple[Optional[float], str]] = {}
+    parsed: List[Tuple[str, Tuple[Tuple[str, int], ...]]] = []
+
+    for formula in dict.fromkeys(formulas):
+        try:
+            components = periodic_table.parse_compound(formula).components
+        except ValueError as err:
+            results[formula] = (None, str(err))
+            continue
+
+        unknown = [element for element, _ in components if element not in table.symbols]
+        if unknown:
+            results[formula] = (None, f"Unknown element {unknown[0]}.")
+        else:
+            parsed.append((formula, components))
+
+    if not parsed:
+        return results
+
+    if np is None:
+        for formula, components in parsed:
+            results[formula] = (periodic_table.compute_atom_weight(components, table), "")
+        return results
+
+    # the element counts of every formula, one after another, and the row
+    # (formula) each belongs to: a sparse version of a matrix with one row
+    # per formula and one column per atomic number
+    counts = [components for _, components in parsed]
+    elements, quantities = zip(*itertools.chain.from_iterable(counts))
+    rows = np.repeat(np.arange(len(counts)), list(map(len, counts)))
+    masses = np.frombuffer(table.atomic_masses, dtype=np.float64)[list(map(table.symbols.__getitem__, elements))]
+
+    # bincount adds up each row's masses times counts in the order
+    # compute_atom_weight() does, so the weights are exactly the same
+    weights = np.bincount(rows, weights=masses * np.array(quantities, dtype=np.float64), minlength=len(counts))
+
+    for (formula, _), weight in zip(parsed, weights.tolist()):
+        results[formula] = (weight, "")
+
+    return results
+
+
+def batches(iterable: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Split an iterable into lists of at most 'size' items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_weights(
+    formulas: Iterable[str],
+    out_file: TextIO,
+    table: periodic_table.PeriodicTable,
+    batch_size: int = BATCH_SIZE,
+):
+    """Write a CSV row of formula, molar mass and error for every formula."""
+    writer = csv.writer(out_file)
+    writer.writerow(["formula", "molar_mass", "error"])
+
+    # formulas already computed in earlier batches
+    known: Dict[str, Tuple[Optional[float], str]] = {}
+
+    for batch in batches(formulas, batch_size):
+        if len(known) > KNOWN_LIMIT:
+            known.clear()
+
+        known.update(compute_weights([formula for formula in batch if formula not in known], table))
+
+        for formula in batch:
+            weight, error = known[formula]
+            writer.writerow([formula, "" if weight is None else repr(round(weight, 6)), error])
+
+
+def main():
+    """Run the program."""
+    parser = argparse.ArgumentParser(description="Compute the molar mass of every formula in a file.")
+    parser.add_argument("file", help="file of formulas, one per line, or a CSV file (see --column)")
+    parser.add_argument("-c", "--column", help="name or number of the CSV column holding the formulas")
+    parser.add_argument("-o", "--output", help="CSV file to write (default: standard output)")
+    parser.add_argument("-b", "--batch-size", type=int, default=BATCH_SIZE, help="formulas computed at a time")
+    args = parser.parse_args()
+
+    table = periodic_table.get_periodic_table()
+
+    with open(args.file, "r", newline="") as in_file:
+        try:
+            formulas = read_formulas(in_file, args.column)
+        except ValueError as err:
+            parser.error(str(err))
+
+        if args.output:
+            with open(args.output, "w", newline="") as out_file:
+                write_weights(formulas, out_file, table, args.batch_size)
+        else:
+            write_weights(formulas, sys.stdout, table, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
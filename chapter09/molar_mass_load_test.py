@@ -0,0 +1,83 @@
+#! /usr/bin/env python3.8
+"""Measure the latency and throughput of a running molar_mass_server.py."""
+
+from typing import List
+import argparse
+import asyncio
+import random
+import time
+
+import molar_mass_server
+
+SAMPLE_FORMULAS = [
+    "H2O",
+    "NaCl",
+    "Ca(OH)2",
+    "Fe2(SO4)3",
+    "CuSO4·5H2O",
+    "C6H12O6",
+    "K4[Fe(CN)6]",
+    "C254H377N65O75S6",
+    "SO4^2-",
+    "NH4+",
+    "CH3-CH2-OH",
+    "Xx2",
+]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the value below which 'fraction' of the sorted values fall."""
+    index = min(len(values) - 1, int(fraction * len(values)))
+    return values[index]
+
+
+async def run_connection(args: argparse.Namespace, latencies: List[float]):
+    """Send args.requests requests over one connection, recording how long each took."""
+    client = await molar_mass_server.AsyncMolarMassClient.connect(args.socket, args.host, args.port)
+    rng = random.Random()
+
+    try:
+        for _ in range(args.requests):
+            formulas = rng.choices(SAMPLE_FORMULAS, k=args.batch)
+            start = time.perf_counter()
+            await client.weigh_many(formulas)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        await client.close()
+
+
+async def run(args: argparse.Namespace):
+    """Run all of the connections at once and print the results."""
+    latencies: List[float] = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(args, latencies) for _ in range(args.connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    requests = len(latencies)
+
+    print(f"\n{requests:,} requests of {args.batch} formulas over {args.connections} connections")
+    print(f"{requests / elapsed:>12,.0f} requests/second")
+    print(f"{requests * args.batch / elapsed:>12,.0f} formulas/second")
+    print(f"{percentile(latencies, 0.50) * 1e3:>12.3f} ms p50 latency")
+    print(f"{percentile(latencies, 0.99) * 1e3:>12.3f} ms p99 latency")
+    print(f"{latencies[-1] * 1e3:>12.3f} ms max latency")
+
+
+def main():
+    """Run the program."""
+    parser = argparse.ArgumentParser(description="Load-test a running molar-mass server.")
+    parser.add_argument("-s", "--socket", help="Unix socket path of the server (default: TCP)")
+    parser.add_argument("--host", default=molar_mass_server.HOST, help="TCP address of the server")
+    parser.add_argument("-p", "--port", type=int, default=molar_mass_server.PORT, help="TCP port of the server")
+    parser.add_argument("-c", "--connections", type=int, default=50, help="concurrent connections")
+    parser.add_argument("-r", "--requests", type=int, default=200, help="requests per connection")
+    parser.add_argument("-b", "--batch", type=int, default=10, help="formulas per request")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#! /usr/bin/env python3.8
+"""A local molar-mass service, and clients for it.
+
+The server keeps the periodic table and a cache of computed weights in
+memory and answers requests over a Unix socket or a localhost TCP port.
+Each request and response is one line of JSON:
+
+    {"formulas": ["H2O", "Ca(OH)2", "Xx"]}
+    {"results": [[18.016, ""], [74.096, ""], [null, "Unknown element Xx."]]}
+
+Each result is the molar mass and an empty string, or null and the reason
+the formula could not be used. Several server processes can share one
+listening socket (--processes).
+"""
+
+from typing import Iterable, List, Optional, Tuple
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import socket
+
+import periodic_table
+
+HOST = "127.0.0.1"
+PORT = 8161
+
+# the most formulas whose weights are kept in memory
+CACHE_SIZE = 100_000
+
+# the longest request line accepted, in bytes
+LINE_LIMIT = 16 * 1024 * 1024
+
+Result = Tuple[Optional[float], str]
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def weigh(formula: str) -> Result:
+    """Return the molar mass of a formula, or None and the reason it can't be computed."""
+    table = periodic_table.get_periodic_table()
+
+    try:
+        components = periodic_table.parse_compound(formula).components
+    except ValueError as err:
+        return None, str(err)
+
+    for element, _ in components:
+        if element not in table:
+            return None, f"Unknown element {element}."
+
+    return periodic_table.compute_atom_weight(components, table), ""
+
+
+def handle_request(line: bytes) -> dict:
+    """Answer one request line."""
+    try:
+        request = json.loads(line)
+        formulas = request["formulas"]
+        if not isinstance(formulas, list) or not all(isinstance(formula, str) for formula in formulas):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return {"error": 'Expected {"formulas": [...]}.'}
+
+    return {"results": [weigh(formula) for formula in formulas]}
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Answer requests from one client until it disconnects."""
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # longer than LINE_LIMIT, the stream can't be recovered
+                writer.write(b'{"error": "Request too long."}\n')
+                break
+            if not line:
+                break
+
+            writer.write(json.dumps(handle_request(line)).encode() + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def make_socket(path: Optional[str] = None, host: str = HOST, port: int = PORT) -> socket.socket:
+    """Create the listening socket, a Unix socket if a path is given."""
+    if path:
+        if os.path.exists(path):
+            os.unlink(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+    else:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+
+    listener.listen(512)
+    listener.setblocking(False)
+    return listener
+
+
+async def _serve(listener: socket.socket):
+    """Answer connections on the listening socket forever."""
+    # load the table before the first request rather than during it
+    periodic_table.get_periodic_table()
+
+    server = await asyncio.start_server(handle_connection, sock=listener, limit=LINE_LIMIT)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(listener: socket.socket):
+    """Run a server process on the listening socket."""
+    try:
+        asyncio.run(_serve(listener))
+    except KeyboardInterrupt:
+        pass
+
+
+def serve_many(listener: socket.socket, processes: int):
+    """Run 'processes' server processes, all accepting from the same socket."""
+    workers = [multiprocessing.Process(target=serve, args=(listener,)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.join()
+
+
+class MolarMassClient:
+    """A blocking client for the molar-mass service.
+
+    Use it as a context manager, or call close() when done:
+
+        with MolarMassClient() as client:
+            print(client.weigh("H2O"))
+    """
+
+    def __init__(self, path: Optional[str] = None, host: str = HOST, port: int = PORT):
+        if path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.file = self.sock.makefile("rwb")
+
+    def weigh_many(self, formulas: Iterable[str]) -> List[Result]:
+        """Return the molar mass and error message of each formula."""
+        self.file.write(json.dumps({"formulas": list(formulas)}).encode() + b"\n")
+        self.file.flush()
+        return _read_response(self.file.readline())
+
+    def weigh(self, formula: str) -> float:
+        """Return the molar mass of one formula, raising ValueError if it's invalid."""
+        weight, error = self.weigh_many([formula])[0]
+        if weight is None:
+            raise ValueError(error)
+        return weight
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncMolarMassClient:
+    """An asyncio client for the molar-mass service; create it with connect()."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, path: Optional[str] = None, host: str = HOST, port: int = PORT):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def weigh_many(self, formulas: Iterable[str]) -> List[Result]:
+        """Return the molar mass and error message of each formula."""
+        self.writer.write(json.dumps({"formulas": list(formulas)}).encode() + b"\n")
+        await self.writer.drain()
+        return _read_response(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def _read_response(line: bytes) -> List[Result]:
+    """Turn a response line into a list of results."""
+    if not line:
+        raise ConnectionError("The server closed the connection.")
+
+    response = json.loads(line)
+    if "error" in response:
+        raise ValueError(response["error"])
+
+    return [(weight, error) for weight, error in response["results"]]
+
+
+def main():
+    """Run the program."""
+    parser = argparse.ArgumentParser(description="Serve molar-mass requests on a local socket.")
+    parser.add_argument("-s", "--socket", help="Unix socket path to listen on (default: a TCP port)")
+    parser.add_argument("--host", default=HOST, help=f"TCP address to listen on (default: {HOST})")
+    parser.add_argument("-p", "--port", type=int, default=PORT, help=f"TCP port to listen on (default: {PORT})")
+    parser.add_argument("-n", "--processes", type=int, default=1, help="number of server processes")
+    args = parser.parse_args()
+
+    listener = make_socket(args.socket, args.host, args.port)
+    print(f"Listening on {args.socket or f'{args.host}:{args.port}'} with {args.processes} process(es)")
+
+    try:
+        if args.processes > 1:
+            serve_many(listener, args.processes)
+        else:
+            serve(listener)
+    finally:
+        listener.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
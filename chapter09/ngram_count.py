@@ -0,0 +1,174 @@
+#! /usr/bin/env python3.8
+"""Count n-grams (runs of n words) and word co-occurrences in a text file.
+
+Words are found with the same tokenizer as word_count.py. Each distinct word
+is given an integer ID and an n-gram is stored as its word IDs packed into a
+single int, so no tuples or joined strings are built while counting.
+"""
+
+from typing import Container, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from collections import Counter, deque
+import argparse
+import heapq
+
+import word_count
+
+# number of bits used for each word ID in a packed key
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+class NgramCounts(NamedTuple):
+    """Counts of packed n-gram keys and the vocabulary needed to unpack them.
+
+    For co-occurrence counts n is 2 and window is the window size."""
+
+    n: int
+    counts: Dict[int, int]
+    vocabulary: List[str]
+    window: int = 0
+
+
+def _read_words(file, chunk_size: int, encoding: Optional[str]) -> Iterator[List[str]]:
+    """Yield the words of the file a chunk at a time."""
+    with open(file, "r", encoding=encoding) as in_file:
+        for chunk in word_count.read_chunks(in_file, chunk_size):
+            yield word_count.tokenize(chunk)
+
+
+def get_ngram_counts(
+    file, n: int = 2, chunk_size: int = word_count.CHUNK_SIZE, encoding=None
+) -> NgramCounts:
+    """Count the n-grams in a file in a single streaming pass.
+
+    The key of each n-gram is kept up to date as words arrive by shifting
+    the oldest word ID out and the newest one in, so n-grams that cross
+    chunk boundaries are counted too."""
+    if n < 1:
+        raise ValueError("n must be at least 1.")
+
+    ids: Dict[str, int] = {}
+    vocabulary: List[str] = []
+    counts: Counter = Counter()
+
+    key_mask = (1 << (ID_BITS * n)) - 1
+    key = 0
+    seen = 0
+
+    for words in _read_words(file, chunk_size, encoding):
+        for word in words:
+            word_id = ids.get(word)
+            if word_id is None:
+                word_id = ids[word] = len(vocabulary)
+                vocabulary.append(word)
+
+            key = ((key << ID_BITS) | word_id) & key_mask
+            seen += 1
+            if seen >= n:
+                counts[key] += 1
+
+    return NgramCounts(n, dict(counts), vocabulary)
+
+
+def get_cooccurrence_counts(
+    file, window: int = 5, chunk_size: int = word_count.CHUNK_SIZE, encoding=None
+) -> NgramCounts:
+    """Count how often two different words appear within 'window' words of each other.
+
+    Pairs are unordered; the key of a pair is its two word IDs packed
+    smallest first, so the result unpacks like bigram counts."""
+    if window < 2:
+        raise ValueError("window must be at least 2.")
+
+    ids: Dict[str, int] = {}
+    vocabulary: List[str] = []
+    counts: Counter = Counter()
+
+    recent: deque = deque(maxlen=window - 1)
+
+    for words in _read_words(file, chunk_size, encoding):
+        for word in words:
+            word_id = ids.get(word)
+            if word_id is None:
+                word_id = ids[word] = len(vocabulary)
+                vocabulary.append(word)
+
+            for other_id in recent:
+                if other_id < word_id:
+                    counts[(other_id << ID_BITS) | word_id] += 1
+                elif other_id > word_id:
+                    counts[(word_id << ID_BITS) | other_id] += 1
+
+            recent.append(word_id)
+
+    return NgramCounts(2, dict(counts), vocabulary, window)
+
+
+def unpack(key: int, n: int, vocabulary: List[str]) -> Tuple[str, ...]:
+    """Turn a packed key back into its words."""
+    return tuple(vocabulary[(key >> (ID_BITS * (n - 1 - i))) & ID_MASK] for i in range(n))
+
+
+def top_ngrams(
+    ngrams: NgramCounts, count: int = 25, exclude: Container[str] = ()
+) -> List[Tuple[Tuple[str, ...], int]]:
+    """Return the 'count' most common n-grams and their counts, most common first.
+
+    N-grams made up only of words in 'exclude' are skipped. As with
+    word_count.top_words() a bounded heap is used, and only the n-grams
+    returned are unpacked."""
+    items = ngrams.counts.items()
+
+    if exclude:
+        excluded_ids = {i for i, word in enumerate(ngrams.vocabulary) if word in exclude}
+        n = ngrams.n
+        items = (
+            item
+            for item in items
+            if not all((item[0] >> (ID_BITS * i)) & ID_MASK in excluded_ids for i in range(n))
+        )
+
+    top = heapq.nlargest(count, items, key=lambda item: item[1])
+
+    return [(unpack(key, ngrams.n, ngrams.vocabulary), n) for key, n in top]
+
+
+def pretty_print(ngrams: NgramCounts, count: int = 25, filtered=True, stopwords_file=word_count.STOPWORDS_FILE):
+    """Print the 'count' most common n-grams and how often they occur."""
+    if ngrams.window:
+        out = f"\nThe {count} most common pairs of words within {ngrams.window} words of each other"
+    else:
+        out = f"\nThe {count} most common {ngrams.n}-word sequences in the file"
+    if filtered:
+        out += ", excepting those made\nonly of the 100 most common English words,"
+    out += " are:\n"
+    print(out)
+
+    exclude = word_count.load_stopwords(stopwords_file) if filtered else frozenset()
+
+    for words, n in top_ngrams(ngrams, count, exclude):
+        print(f"{' '.join(words):<40}{n:>8}")
+
+
+def main():
+    """Run the program."""
+    parser = argparse.ArgumentParser(description="Count the most common n-grams in a text file.")
+    parser.add_argument("file", help="the text file to read")
+    parser.add_argument("-n", type=int, default=2, help="number of words in each n-gram (default: 2)")
+    parser.add_argument("-t", "--top", type=int, default=25, help="number of n-grams to print (default: 25)")
+    parser.add_argument(
+        "-w", "--window", type=int, help="count pairs of words within this many words of each other instead"
+    )
+    parser.add_argument("--no-filter", action="store_true", help="do not leave out common words")
+    args = parser.parse_args()
+
+    if args.window:
+        ngrams = get_cooccurrence_counts(args.file, args.window)
+    else:
+        ngrams = get_ngram_counts(args.file, args.n)
+
+    pretty_print(ngrams, args.top, not args.no_filter)
+
+
+if __name__ == "__main__":
+    main()
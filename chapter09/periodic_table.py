@@ -1,14 +1,137 @@
 #! /usr/bin/env python3.7
 """Compute the atomic weight of a chemical compound given its formula."""
 import csv
+import functools
+import os
+import pathlib
+import pickle
 import re
-from typing import Dict, List, Tuple
+from array import array
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# The pieces of a full chemical formula, e.g., "[Cu(NH3)4]SO4·H2O" or "SO4^2-".
+# A charge is written "^2-", "^+", or as one or more signs at the very end; a
+# hyphen anywhere else is a bond in a condensed formula, like "CH3-CH2-OH",
+# and is ignored
+COMPOUND_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<element>[A-Z][a-z]*)
+  | (?P<count>\d+)
+  | (?P<open>[(\[])
+  | (?P<close>[)\]])
+  | (?P<hydrate>[·•.*])
+  | (?P<charge>\^[+-]\d+|\^\d*[+-]|[+-]+\s*$)
+  | (?P<bond>-)
+  | (?P<space>\s+)
+    """,
+    re.VERBOSE,
+)
+
+MATCHING_BRACKETS = {")": "(", "]": "["}
+
+# the periodic table, found next to this file rather than in the current
+# directory, and the pickled PeriodicTable built from it
+PERIODIC_TABLE_FILE = pathlib.Path(__file__).parent / "periodic_table.csv"
+SNAPSHOT_FILE = pathlib.Path(__file__).parent / "__pycache__" / "periodic_table.csv.pickle"
+
+
+class Compound(NamedTuple):
+    """A parsed chemical formula: each element's total count, and the charge."""
+
+    components: Tuple[Tuple[str, int], ...]
+    charge: int = 0
+
+
+class Element(NamedTuple):
+    """One row of the periodic table, with the numbers already converted."""
+
+    atomic_number: int
+    symbol: str
+    new_group: str
+    old_group: str
+    period: int
+    element_name: str
+    atomic_mass: float
+
+
+class PeriodicTable:
+    """The periodic table as parallel arrays indexed by atomic number.
+
+    elements[n] and atomic_masses[n] describe element number n (index 0 and
+    missing elements hold None and 0.0), and symbols maps each symbol to its
+    atomic number. Like the dictionary from read_periodic_table(), a
+    PeriodicTable is looked up by symbol: table["O"], "O" in table."""
+
+    __slots__ = ("elements", "atomic_masses", "symbols")
+
+    def __init__(self, elements: Tuple[Optional[Element], ...], atomic_masses: array, symbols: Dict[str, int]):
+        self.elements = elements
+        self.atomic_masses = atomic_masses
+        self.symbols = symbols
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.symbols
+
+    def __getitem__(self, symbol: str) -> Element:
+        return self.elements[self.symbols[symbol]]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
 
 
 def read_periodic_table() -> Dict:
     """Read in the contents of the periodic table CSV file."""
+    return make_periodic_table_dict(_read_periodic_table_lines())
+
+
+def load_periodic_table() -> PeriodicTable:
+    """Read in the periodic table CSV file as a PeriodicTable."""
+    return make_periodic_table(_read_periodic_table_lines())
+
+
+@functools.lru_cache(maxsize=None)
+def get_periodic_table() -> PeriodicTable:
+    """Return the PeriodicTable, building it only once per process.
+
+    The table is loaded from a pickled snapshot if there is one for the
+    current version of the CSV file (same size and modification time).
+    Otherwise the CSV file is parsed and a new snapshot saved for next time;
+    if the snapshot can't be written the table is still returned.
+
+    The snapshot holds only plain tuples, not Element or PeriodicTable
+    objects, so it doesn't matter whether it was written by this file run
+    as a script (whose classes live in __main__) or by a module importing it."""
+    stat = os.stat(PERIODIC_TABLE_FILE)
+    version = (stat.st_size, stat.st_mtime_ns)
+
+    try:
+        with open(SNAPSHOT_FILE, "rb") as snapshot_file:
+            snapshot_version, rows = pickle.load(snapshot_file)
+        if snapshot_version == version:
+            return _build_periodic_table([Element._make(row) for row in rows])
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+        pass
+
+    records = _read_elements(_read_periodic_table_lines())
+
     try:
-        with open("periodic_table.csv", "r") as in_file:
+        os.makedirs(SNAPSHOT_FILE.parent, exist_ok=True)
+        temp_file = SNAPSHOT_FILE.with_name(f"{SNAPSHOT_FILE.name}.{os.getpid()}.tmp")
+        with open(temp_file, "wb") as snapshot_file:
+            rows = [tuple(record) for record in records]
+            pickle.dump((version, rows), snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, SNAPSHOT_FILE)
+    except OSError:
+        pass
+
+    return _build_periodic_table(records)
+
+
+def _read_periodic_table_lines() -> List[str]:
+    """Read the lines of the periodic table CSV file."""
+    try:
+        with open(PERIODIC_TABLE_FILE, "r") as in_file:
             # make a list of strings where each string is a line of text from
             # periodic_table.csv if and only if that line starts with a number
             # (i.e., it is not a header line)
@@ -19,7 +142,7 @@ def read_periodic_table() -> Dict:
         # printing an error message
         raise SystemExit("File periodic_table.csv not found. Program terminating.")
     else:
-        return make_periodic_table_dict(text)
+        return text
 
 
 def make_periodic_table_dict(elements: List[str]) -> Dict:
@@ -50,11 +173,149 @@ def make_periodic_table_dict(elements: List[str]) -> Dict:
     return periodic_table
 
 
-def get_compound_string(prompt):
+def make_periodic_table(elements: List[str]) -> PeriodicTable:
+    """Create a PeriodicTable from the lines of the periodic table CSV file.
+
+    Unlike make_periodic_table_dict(), the numeric columns are converted once
+    here rather than every time they are used."""
+    return _build_periodic_table(_read_elements(elements))
+
+
+def _read_elements(elements: List[str]) -> List[Element]:
+    """Convert the lines of the periodic table CSV file, after the header, to Elements."""
+    rows = [element.split(",") for element in elements[1:]]
+
+    # skip missing elements like Tennessine (#117)
+    return [Element(int(row[0]), row[1], row[2], row[3], int(row[4]), row[5], float(row[6])) for row in rows if row[0]]
+
+
+def _build_periodic_table(records: List[Element]) -> PeriodicTable:
+    """Put the Elements in a PeriodicTable, indexed by atomic number."""
+    size = max(record.atomic_number for record in records) + 1
+    table: List[Optional[Element]] = [None] * size
+    atomic_masses = array("d", [0.0] * size)
+
+    for record in records:
+        table[record.atomic_number] = record
+        atomic_masses[record.atomic_number] = record.atomic_mass
+
+    symbols = {record.symbol: record.atomic_number for record in records}
+
+    return PeriodicTable(tuple(table), atomic_masses, symbols)
+
+
+def get_compound_string(prompt) -> Compound:
     """Prompt the user for a chemical compound string."""
     compound_string = input(prompt)
 
-    return parse_compound_string(compound_string)
+    return parse_compound(compound_string)
+
+
+def _parse_charge(text: str) -> int:
+    """Turn a charge such as "^2-", "^+3" or "++" into a number.
+
+    Raises ValueError for a mix of signs, e.g., "-+", or a charge of zero."""
+    text = text.strip().lstrip("^")
+    signs = text.strip("0123456789")
+    if len(set(signs)) != 1:
+        raise ValueError(f"Mixed signs in charge {text!r}.")
+
+    digits = text.strip("+-")
+    charge = int(digits) if digits else len(signs)
+    if charge == 0:
+        raise ValueError("A charge can't be zero.")
+
+    return -charge if signs[0] == "-" else charge
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_compound(compound_string: str) -> Compound:
+    """Parse a full chemical formula into each element's total count and the charge.
+
+    Understands nested groups ("Ca(OH)2", "[Cu(NH3)4]SO4"), hydrates and
+    other adducts with an optional leading coefficient ("CuSO4·5H2O", also
+    written with "." or "*"), and charges ("SO4^2-", "NH4+"). The formula
+    is read once from left to right, keeping a stack of element counts for
+    the groups that are still open. Elements are listed in the order they
+    first appear. Raises ValueError, saying what is wrong, if the formula
+    cannot be parsed."""
+    # one Counter per open group, the whole part being read is at the bottom
+    stack: List[Counter] = [Counter()]
+    brackets: List[str] = []
+    total: Counter = Counter()
+    coefficient = 1
+    charge = 0
+    seen_charge = False
+
+    # what a count that follows applies to: an element symbol, a group that
+    # was just closed, the coefficient of a hydrate part, or nothing
+    previous: Tuple[str, object] = ("start", None)
+
+    position = 0
+    while position < len(compound_string):
+        match = COMPOUND_TOKEN_REGEX.match(compound_string, position)
+        if not match:
+            raise ValueError(f"Unexpected {compound_string[position]!r} at position {position}.")
+        position = match.end()
+        kind, text = match.lastgroup, match.group()
+
+        if kind in ("space", "bond"):
+            continue
+
+        if seen_charge:
+            raise ValueError("A charge must come at the end of the formula.")
+
+        if kind == "element":
+            stack[-1][text] += 1
+            previous = ("element", text)
+        elif kind == "count":
+            quantity = int(text)
+            if quantity == 0:
+                raise ValueError("Counts must be greater than zero.")
+            if previous[0] == "element":
+                stack[-1][previous[1]] += quantity - 1
+            elif previous[0] == "group":
+                for element, n in previous[1].items():
+                    stack[-1][element] += n * (quantity - 1)
+            elif previous[0] == "start" and not brackets:
+                coefficient = quantity
+            else:
+                raise ValueError(f"Unexpected count {text!r} at position {match.start()}.")
+            previous = ("count", None)
+        elif kind == "open":
+            brackets.append(text)
+            stack.append(Counter())
+            previous = ("open", None)
+        elif kind == "close":
+            if not brackets or brackets.pop() != MATCHING_BRACKETS[text]:
+                raise ValueError(f"Unmatched {text!r} at position {match.start()}.")
+            group = stack.pop()
+            if not group:
+                raise ValueError(f"Empty group at position {match.start()}.")
+            stack[-1].update(group)
+            previous = ("group", group)
+        elif kind == "hydrate":
+            if brackets or not stack[-1]:
+                raise ValueError(f"Unexpected {text!r} at position {match.start()}.")
+            for element, n in stack[-1].items():
+                total[element] += n * coefficient
+            stack[-1] = Counter()
+            coefficient = 1
+            previous = ("start", None)
+        elif kind == "charge":
+            charge = _parse_charge(text)
+            seen_charge = True
+
+    if brackets:
+        raise ValueError(f"Unclosed {brackets[-1]!r}.")
+
+    if not stack[-1]:
+        raise ValueError("Missing elements.")
+
+    for element, n in stack[-1].items():
+        total[element] += n * coefficient
+
+    return Compound(tuple(total.items()), charge)
 
 
 def parse_compound_string(compound_string: str) -> List[str]:
@@ -106,7 +367,18 @@ def print_elements_in_compound(*args):
 
 def compute_atom_weight(components: List[Tuple[str, int]], periodic_table) -> float:
     """Add each component's atomic mass to the total mass using the information
-    in the dictionary."""
+    in the dictionary.
+
+    periodic_table may also be a PeriodicTable, in which case the masses are
+    looked up as floats without any conversion."""
+    if isinstance(periodic_table, PeriodicTable):
+        masses = periodic_table.atomic_masses
+        symbols = periodic_table.symbols
+        weight = 0.0
+        for element, qty in components:
+            weight += masses[symbols[element]] * qty
+        return weight
+
     weight = 0
 
     for component in components:
@@ -119,21 +391,24 @@ def compute_atom_weight(components: List[Tuple[str, int]], periodic_table) -> fl
 
 def main():
     """Run the program."""
-    periodic_table = read_periodic_table()
+    periodic_table = get_periodic_table()
 
     while True:
         try:
-            compound_string = get_compound_string("Please enter a compound string: ")
-        except ValueError:
-            print("Invalid chemical compound. Please try again.")
+            compound = get_compound_string("Please enter a compound string: ")
+        except ValueError as err:
+            print(f"Invalid chemical compound. {err} Please try again.")
         else:
-            break
+            unknown = [c[0] for c in compound.components if c[0] not in periodic_table]
+            if not unknown:
+                break
+            print(f"Unknown element {unknown[0]}. Please try again.")
 
-    components = parse_element_quantities(compound_string)
+    components = compound.components
 
     # get the names of the elements in the compound for printing
     # can you re-write the list complrehension as a series of Python statements?
-    component_names = [periodic_table[c[0]]["element_name"] for c in components]
+    component_names = [periodic_table[c[0]].element_name for c in components]
 
     print_elements_in_compound(*component_names)
 
@@ -141,6 +416,9 @@ def main():
 
     print(f"The atomic weight of the compound is {compound_atomic_weight}")
 
+    if compound.charge:
+        print(f"The charge of the compound is {compound.charge:+d}")
+
     print("Bye!")
 
 
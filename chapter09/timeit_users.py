@@ -0,0 +1,87 @@
+#! /usr/bin/env python3.8
+"""Compare the csv module with the columnar format for querying a users file."""
+
+from collections import Counter
+import csv
+import os
+import random
+import string
+import tempfile
+import time
+import timeit
+
+import users_columnar
+
+ROWS = 1_000_000
+DOMAINS = ["t.co", "51.la", "so-net.ne.jp", "dyndns.org", "elpais.com", "example.com"]
+
+random.seed(161)
+last_names = ["".join(random.choices(string.ascii_lowercase, k=random.randint(4, 9))) for _ in range(20_000)]
+first_names = ["".join(random.choices(string.ascii_lowercase, k=random.randint(3, 8))) for _ in range(5_000)]
+
+
+def make_users(file):
+    with open(file, "w", newline="") as out_file:
+        writer = csv.writer(out_file)
+        writer.writerow(["id", "last_name", "first_name", "email"])
+        for n in range(1, ROWS + 1):
+            last_name = random.choice(last_names)
+            first_name = random.choice(first_names)
+            writer.writerow([n, last_name, first_name, f"{first_name[0]}{last_name}{n}@{random.choice(DOMAINS)}"])
+
+
+def csv_count_by_last_name(file):
+    with open(file, "r", newline="") as in_file:
+        reader = csv.reader(in_file)
+        next(reader)
+        return dict(Counter(row[1] for row in reader).most_common())
+
+
+def csv_rows_with_domain(file, domain):
+    with open(file, "r", newline="") as in_file:
+        reader = csv.reader(in_file)
+        next(reader)
+        return [n for n, row in enumerate(reader) if row[3].rpartition("@")[2].lower() == domain]
+
+
+def columnar_count_by_last_name(file):
+    with users_columnar.ColumnarUsers.open(file) as users:
+        return users.count_by_last_name()
+
+
+def columnar_rows_with_domain(file, domain):
+    with users_columnar.ColumnarUsers.open(file) as users:
+        return users.rows_with_email_domain(domain)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file = os.path.join(temp_dir, "users.csv")
+        make_users(file)
+
+        start = time.perf_counter()
+        users_columnar.convert(file)
+        converted = time.perf_counter() - start
+
+        assert csv_count_by_last_name(file) == columnar_count_by_last_name(file)
+        assert csv_rows_with_domain(file, "t.co") == columnar_rows_with_domain(file, "t.co")
+
+        print()
+        print(f"Querying {ROWS:,} users ({os.path.getsize(file) / 1e6:.1f} MB of CSV)...")
+        print(f"{converted:>.5f} seconds (converting to columns, once)")
+
+        for label, function in [
+            ("count by last name, csv module", lambda: csv_count_by_last_name(file)),
+            ("count by last name, columnar", lambda: columnar_count_by_last_name(file)),
+            ("filter by email domain, csv module", lambda: csv_rows_with_domain(file, "t.co")),
+            ("filter by email domain, columnar", lambda: columnar_rows_with_domain(file, "t.co")),
+        ]:
+            seconds = timeit.timeit(function, number=3) / 3
+            print(f"{seconds:>.5f} seconds ({label})")
+
+    # Querying 1,000,000 users (46.0 MB of CSV)...
+    # 6.28689 seconds (converting to columns, once)
+    # 1.28212 seconds (count by last name, csv module)
+    # 0.15501 seconds (count by last name, columnar)
+    # 1.21730 seconds (filter by email domain, csv module)
+    # 0.06215 seconds (filter by email domain, columnar)
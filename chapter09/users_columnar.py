@@ -0,0 +1,310 @@
+#! /usr/bin/env python3.8
+"""Convert a users CSV file like users.csv to a columnar format and query it.
+
+Each column is stored in its own file in a directory next to the CSV:
+
+    id.q                   the ids as 64-bit integers
+    last_name.codes        a 32-bit code per row, an index into...
+    last_name.json         ...the list of distinct last names
+    first_name.codes       the same for first names
+    first_name.json
+    email_user.offsets     the part of each email address before the "@",
+    email_user.data        stored back to back with 64-bit end offsets
+    email_domain.codes     the part after the "@" as written, dictionary-
+    email_domain.json      encoded; null for an address without an "@",
+                           whose whole text is in email_user
+    meta.json              the number of rows, the CSV's headers, the size
+                           and modification time of the CSV, and the format
+
+The columns are written to a temporary directory that is renamed into place
+when they are complete, so an interrupted conversion never leaves broken
+columns behind. On load the column files are memory-mapped, so a query only
+reads the columns it uses, e.g., counting by last name touches only
+last_name.codes.
+"""
+
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from array import array
+from collections import Counter, namedtuple
+import argparse
+import csv
+import itertools
+import json
+import mmap
+import os
+import pathlib
+import shutil
+
+# rows converted at a time
+BATCH_SIZE = 100_000
+
+DICTIONARY_COLUMNS = ("last_name", "first_name", "email_domain")
+
+# changed whenever the column files change, so older columns are rebuilt
+FORMAT = 2
+
+User = namedtuple("User", "id, last_name, first_name, email")
+
+
+def columns_path(file) -> pathlib.Path:
+    """Return the directory the columns of a CSV file are stored in."""
+    return pathlib.Path(f"{file}.columns")
+
+
+class _DictionaryWriter:
+    """Write a dictionary-encoded column a batch at a time."""
+
+    def __init__(self, directory: pathlib.Path, name: str):
+        self.directory = directory
+        self.name = name
+        self.codes: Dict[str, int] = {}
+        self.out_file = open(directory / f"{name}.codes", "wb")
+
+    def write(self, values: List[str]):
+        codes = self.codes
+        batch = array("I", (codes.setdefault(value, len(codes)) for value in values))
+        batch.tofile(self.out_file)
+
+    def close(self):
+        self.out_file.close()
+        with open(self.directory / f"{self.name}.json", "w") as out_file:
+            json.dump(list(self.codes), out_file)
+
+
+def _source_version(file) -> Dict[str, int]:
+    """Return the size and modification time of a CSV file, as saved in meta.json."""
+    stat = os.stat(file)
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def convert(file, directory=None) -> pathlib.Path:
+    """Convert a users CSV file to columns, reading it a batch of rows at a time.
+
+    Any columns already in the directory are replaced only once the new ones
+    are complete."""
+    directory = pathlib.Path(directory or columns_path(file))
+    temp_directory = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    if temp_directory.exists():
+        shutil.rmtree(temp_directory)
+    temp_directory.mkdir(parents=True)
+
+    try:
+        _write_columns(file, temp_directory)
+    except BaseException:
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        raise
+
+    if directory.exists():
+        old_directory = directory.with_name(f"{directory.name}.{os.getpid()}.old")
+        os.rename(directory, old_directory)
+        os.rename(temp_directory, directory)
+        shutil.rmtree(old_directory, ignore_errors=True)
+    else:
+        os.rename(temp_directory, directory)
+
+    return directory
+
+
+def _write_columns(file, directory: pathlib.Path):
+    """Write the columns of a CSV file into an empty directory."""
+    version = _source_version(file)
+
+    dictionaries = {name: _DictionaryWriter(directory, name) for name in DICTIONARY_COLUMNS}
+    rows = 0
+    end = 0
+
+    with open(file, "r", newline="") as in_file, open(directory / "id.q", "wb") as id_file, open(
+        directory / "email_user.offsets", "wb"
+    ) as offsets_file, open(directory / "email_user.data", "wb") as data_file:
+        reader = csv.reader(in_file)
+        headers = next(reader)
+        id_column, last_name_column, first_name_column, email_column = (
+            headers.index(name) for name in User._fields
+        )
+
+        while True:
+            batch = list(itertools.islice(reader, BATCH_SIZE))
+            if not batch:
+                break
+            rows += len(batch)
+
+            array("q", (int(row[id_column]) for row in batch)).tofile(id_file)
+            dictionaries["last_name"].write([row[last_name_column] for row in batch])
+            dictionaries["first_name"].write([row[first_name_column] for row in batch])
+
+            users, ats, domains = zip(*(row[email_column].rpartition("@") for row in batch))
+            # rpartition() puts an address without an "@" in the domain
+            users = [user if at else domain for user, at, domain in zip(users, ats, domains)]
+            dictionaries["email_domain"].write([domain if at else None for at, domain in zip(ats, domains)])
+
+            data = [user.encode("utf-8") for user in users]
+            offsets = array("Q")
+            for user in data:
+                end += len(user)
+                offsets.append(end)
+            offsets.tofile(offsets_file)
+            data_file.write(b"".join(data))
+
+    for dictionary in dictionaries.values():
+        dictionary.close()
+
+    with open(directory / "meta.json", "w") as out_file:
+        json.dump({"rows": rows, "headers": headers, "format": FORMAT, **version}, out_file)
+
+
+def _map(file: BinaryIO, typecode: str) -> Tuple[Optional[mmap.mmap], memoryview]:
+    """Memory-map a column file as a sequence of numbers of the given array type code.
+
+    Returns the mapping, to be closed when done (None for an empty file,
+    which can't be mapped), and the view of it as numbers."""
+    if os.fstat(file.fileno()).st_size == 0:
+        return None, memoryview(array(typecode))
+
+    mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapping, memoryview(mapping).cast(typecode)
+
+
+class ColumnarUsers:
+    """A memory-mapped columnar users file; create it with open()."""
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        with open(self.directory / "meta.json", "r") as in_file:
+            self.rows = json.load(in_file)["rows"]
+
+        self._files: List[BinaryIO] = []
+        self._mappings: List[mmap.mmap] = []
+        self._columns: Dict[str, memoryview] = {}
+        self._dictionaries: Dict[str, List[str]] = {}
+
+    @classmethod
+    def open(cls, file) -> "ColumnarUsers":
+        """Open the columns of a CSV file, converting it first if they are missing or
+        were made from a different version of it (size or modification time)."""
+        directory = columns_path(file)
+        version = _source_version(file)
+
+        try:
+            with open(directory / "meta.json", "r") as in_file:
+                meta = json.load(in_file)
+            current = meta.get("format") == FORMAT and all(meta.get(key) == value for key, value in version.items())
+        except (OSError, ValueError):
+            current = False
+
+        if not current:
+            convert(file, directory)
+        return cls(directory)
+
+    def column(self, name: str, typecode: str = "I") -> memoryview:
+        """Return a column file mapped into memory, mapping it the first time it is asked for."""
+        suffix = {"I": "codes", "q": "q", "Q": "offsets", "B": "data"}[typecode]
+        key = f"{name}.{suffix}"
+
+        if key not in self._columns:
+            column_file = open(self.directory / key, "rb")
+            self._files.append(column_file)
+            mapping, self._columns[key] = _map(column_file, typecode)
+            if mapping is not None:
+                self._mappings.append(mapping)
+
+        return self._columns[key]
+
+    def dictionary(self, name: str) -> List[str]:
+        """Return the distinct values of a dictionary-encoded column."""
+        if name not in self._dictionaries:
+            with open(self.directory / f"{name}.json", "r") as in_file:
+                self._dictionaries[name] = json.load(in_file)
+
+        return self._dictionaries[name]
+
+    def _email_user(self, row: int) -> str:
+        offsets = self.column("email_user", "Q")
+        start = offsets[row - 1] if row else 0
+        return bytes(self.column("email_user", "B")[start : offsets[row]]).decode("utf-8")
+
+    def row(self, row: int) -> User:
+        """Put one row back together from its columns."""
+        domain = self.dictionary("email_domain")[self.column("email_domain")[row]]
+        user = self._email_user(row)
+
+        return User(
+            self.column("id", "q")[row],
+            self.dictionary("last_name")[self.column("last_name")[row]],
+            self.dictionary("first_name")[self.column("first_name")[row]],
+            user if domain is None else f"{user}@{domain}",
+        )
+
+    def rows_with_email_domain(self, domain: str) -> List[int]:
+        """Return the numbers of the rows whose email address is at this domain (ignoring case)."""
+        domain = domain.lower()
+        codes = {
+            code for code, value in enumerate(self.dictionary("email_domain")) if value is not None and value.lower() == domain
+        }
+
+        if not codes:
+            return []
+        if len(codes) == 1:
+            code = codes.pop()
+            return [row for row, value in enumerate(self.column("email_domain")) if value == code]
+        return [row for row, value in enumerate(self.column("email_domain")) if value in codes]
+
+    def users_with_email_domain(self, domain: str) -> Iterator[User]:
+        """Yield the users whose email address is at this domain."""
+        for row in self.rows_with_email_domain(domain):
+            yield self.row(row)
+
+    def count_by(self, name: str) -> Dict[str, int]:
+        """Count the rows having each value of a dictionary-encoded column, most common first."""
+        values = self.dictionary(name)
+        return {values[code]: n for code, n in Counter(self.column(name)).most_common()}
+
+    def count_by_last_name(self) -> Dict[str, int]:
+        """Count the users having each last name, most common first."""
+        return self.count_by("last_name")
+
+    def close(self):
+        for column in self._columns.values():
+            column.release()
+        for mapping in self._mappings:
+            try:
+                mapping.close()
+            except BufferError:
+                # a slice of the column is still in use; the mapping is
+                # closed when that slice is garbage collected
+                pass
+        for column_file in self._files:
+            column_file.close()
+        self._columns.clear()
+        self._mappings.clear()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """Run the program."""
+    parser = argparse.ArgumentParser(description="Query a users CSV file through its columnar copy.")
+    parser.add_argument("file", help="users CSV file")
+    parser.add_argument("-d", "--domain", help="list the users with an email address at this domain")
+    parser.add_argument("-l", "--last-names", type=int, metavar="N", help="show the N most common last names")
+    args = parser.parse_args()
+
+    with ColumnarUsers.open(args.file) as users:
+        print(f"{users.rows:,} users")
+
+        if args.domain:
+            for user in users.users_with_email_domain(args.domain):
+                print(f"id: {user.id} last name: {user.last_name} first name: {user.first_name} email: {user.email}")
+
+        if args.last_names:
+            counts = users.count_by_last_name()
+            for name, n in itertools.islice(counts.items(), args.last_names):
+                print(f"{name:<20}{n:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#! /usr/bin/env python3.8
+"""Stream and index a users CSV file like users.csv.
+
+read_users() yields each row as a namedtuple, so a file of any size can be
+processed without holding it in memory. UserIndex records the byte offset of
+each row under its id and email (hash indexes) and its last name (a sorted
+index, for prefix lookups), and can save those indexes next to the CSV file
+so later runs can look users up without reading the whole file again.
+
+Each row must be on a single line (no quoted newlines), as in users.csv.
+"""
+
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from collections import namedtuple
+import bisect
+import csv
+import itertools
+import os
+import pathlib
+import pickle
+import sys
+
+USERS_FILE = pathlib.Path(__file__).parent / "users.csv"
+
+# bytes of lines read and parsed at a time when building the indexes
+READ_SIZE = 1 << 20
+
+
+def read_users(file=USERS_FILE) -> Iterator[tuple]:
+    """Yield each row of the file as a namedtuple whose fields are the CSV's headers."""
+    with open(file, "r", newline="") as in_file:
+        reader = csv.reader(in_file)
+        User = namedtuple("User", next(reader))
+        for row in reader:
+            yield User._make(row)
+
+
+def _read_rows(in_file: BinaryIO) -> Iterator[Tuple[int, List[str]]]:
+    """Yield the byte offset and fields of every row after the header.
+
+    The lines are read about a megabyte at a time and each batch goes
+    through one csv.reader, which gives one row per line, blank or not, so
+    the rows line up with the lines' offsets."""
+    in_file.seek(0)
+    offset = len(in_file.readline())
+
+    while True:
+        lines = in_file.readlines(READ_SIZE)
+        if not lines:
+            return
+
+        starts = itertools.accumulate(map(len, lines), initial=offset)
+        for start, fields in zip(starts, csv.reader(map(bytes.decode, lines))):
+            if fields:
+                yield start, fields
+
+        offset += sum(map(len, lines))
+
+
+class Indexes(NamedTuple):
+    """The saved indexes, with the size and modification time of the file they cover."""
+
+    version: Tuple[int, int]
+    headers: List[str]
+    ids: Dict[str, int]
+    emails: Dict[str, int]
+    last_names: List[str]
+    last_name_offsets: List[int]
+
+
+class UserIndex:
+    """Look up rows of a users CSV file by id, email or last name prefix.
+
+    Use it as a context manager, or call close() when done:
+
+        with UserIndex.open("users.csv") as users:
+            print(users.get_by_email("lnelissen0@t.co"))
+    """
+
+    def __init__(self, file, indexes: Indexes):
+        self.file = file
+        self.indexes = indexes
+        self.in_file = open(file, "rb")
+        self.User = namedtuple("User", indexes.headers)
+
+    @staticmethod
+    def index_path(file) -> pathlib.Path:
+        """Return where the indexes of a CSV file are saved."""
+        return pathlib.Path(f"{file}.idx")
+
+    @staticmethod
+    def _version(file) -> Tuple[int, int]:
+        stat = os.stat(file)
+        return stat.st_size, stat.st_mtime_ns
+
+    @classmethod
+    def build(cls, file=USERS_FILE, save: bool = True) -> "UserIndex":
+        """Read the whole file once and index it, saving the indexes unless save is False.
+
+        If the indexes can't be saved they are still returned. If an id or
+        email appears more than once, the first row wins."""
+        version = cls._version(file)
+        ids: Dict[str, int] = {}
+        emails: Dict[str, int] = {}
+        last_names: List[Tuple[str, int]] = []
+
+        with open(file, "rb") as in_file:
+            headers = next(csv.reader([in_file.readline().decode("utf-8")]))
+            id_column = headers.index("id")
+            email_column = headers.index("email")
+            last_name_column = headers.index("last_name")
+
+            for offset, fields in _read_rows(in_file):
+                ids.setdefault(fields[id_column], offset)
+                emails.setdefault(fields[email_column].lower(), offset)
+                last_names.append((fields[last_name_column].lower(), offset))
+
+        last_names.sort()
+        indexes = Indexes(
+            version,
+            headers,
+            ids,
+            emails,
+            [name for name, _ in last_names],
+            [offset for _, offset in last_names],
+        )
+
+        if save:
+            path = cls.index_path(file)
+            temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            try:
+                with open(temp_path, "wb") as out_file:
+                    # a plain tuple, so the file doesn't depend on where Indexes
+                    # was defined: __main__ when this file is run as a script
+                    pickle.dump(tuple(indexes), out_file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, path)
+            except OSError:
+                # e.g., the CSV file is in a read-only directory; the indexes
+                # still work, they just aren't saved for next time
+                pass
+
+        return cls(file, indexes)
+
+    @classmethod
+    def open(cls, file=USERS_FILE) -> "UserIndex":
+        """Load the saved indexes of a file, building them first if they are missing or out of date."""
+        try:
+            with open(cls.index_path(file), "rb") as index_file:
+                indexes = Indexes._make(pickle.load(index_file))
+            if indexes.version == cls._version(file):
+                return cls(file, indexes)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+            pass
+
+        return cls.build(file)
+
+    def _row_at(self, offset: int) -> tuple:
+        """Read the row that starts at a byte offset."""
+        self.in_file.seek(offset)
+        line = self.in_file.readline().decode("utf-8")
+        return self.User._make(next(csv.reader([line])))
+
+    def get_by_id(self, user_id) -> Optional[tuple]:
+        """Return the user with this id, or None."""
+        offset = self.indexes.ids.get(str(user_id))
+        return None if offset is None else self._row_at(offset)
+
+    def get_by_email(self, email: str) -> Optional[tuple]:
+        """Return the user with this email address (ignoring case), or None."""
+        offset = self.indexes.emails.get(email.lower())
+        return None if offset is None else self._row_at(offset)
+
+    def find_by_last_name(self, prefix: str) -> Iterator[tuple]:
+        """Yield the users whose last name starts with prefix (ignoring case), in name order."""
+        prefix = prefix.lower()
+        names = self.indexes.last_names
+        offsets = self.indexes.last_name_offsets
+
+        position = bisect.bisect_left(names, prefix)
+        while position < len(names) and names[position].startswith(prefix):
+            yield self._row_at(offsets[position])
+            position += 1
+
+    def close(self):
+        self.in_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """Look up users by id, email address or last name prefix given on the command line."""
+    if len(sys.argv) < 3 or sys.argv[1] not in ("id", "email", "last_name"):
+        raise SystemExit(f"Usage: {sys.argv[0]} id|email|last_name VALUE [CSV_FILE]")
+
+    field, value = sys.argv[1], sys.argv[2]
+    file = sys.argv[3] if len(sys.argv) > 3 else USERS_FILE
+
+    with UserIndex.open(file) as users:
+        if field == "id":
+            matches = [users.get_by_id(value)]
+        elif field == "email":
+            matches = [users.get_by_email(value)]
+        else:
+            matches = list(users.find_by_last_name(value))
+
+        for user in matches:
+            if user is not None:
+                print(f"id: {user.id} last name: {user.last_name} first name: {user.first_name} email address: {user.email}")
+
+
+if __name__ == "__main__":
+    main()
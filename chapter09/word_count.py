@@ -1,10 +1,65 @@
 #! /usr/bin/env python3.8
 """Word count example."""
 
-from typing import Dict
-from string import punctuation
-from collections import namedtuple
+from typing import BinaryIO, Container, Dict, FrozenSet, Iterable, Iterator, List, Optional, TextIO, Tuple
+from string import ascii_lowercase, ascii_uppercase, punctuation, whitespace
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import codecs
+import csv
+import functools
+import glob
+import hashlib
+import heapq
+import json
+import locale
+import mmap
+import os
 import pathlib
+import re
+import sys
+
+# number of characters read from the file at a time when streaming
+CHUNK_SIZE = 1 << 20
+
+# bytes of a memory-mapped file tokenized at a time; each chunk's list of
+# tokens is the largest thing get_word_counts_mmap() allocates, and one
+# 64 KiB chunk's worth stays small while still being big enough that the
+# per-chunk overhead doesn't show
+MMAP_CHUNK_SIZE = 1 << 16
+
+# table used to strip punctuation, built once rather than on every call
+PUNCTUATION_TABLE = str.maketrans("", "", punctuation)
+
+# the last whitespace character of a string (\s matches exactly the characters
+# str.isspace() and str.split() treat as whitespace)
+LAST_WHITESPACE_REGEX = re.compile(r"\s(?=\S*\Z)")
+
+# the ASCII whitespace bytes, any of which is a safe place to split a file that
+# uses an ASCII-compatible encoding such as UTF-8
+WHITESPACE_BYTES = frozenset(whitespace.encode("ascii"))
+
+# bytes.translate() table that lower-cases ASCII letters and turns the four
+# ASCII separator characters (which str.split() treats as whitespace but
+# bytes.split() does not) into spaces, plus the punctuation bytes to delete
+BYTES_TABLE = bytes.maketrans(
+    ascii_uppercase.encode("ascii") + b"\x1c\x1d\x1e\x1f",
+    ascii_lowercase.encode("ascii") + b"    ",
+)
+PUNCTUATION_BYTES = punctuation.encode("ascii")
+
+# the default list of words left out of the results, one word per line
+STOPWORDS_FILE = pathlib.Path(__file__).parent / "most_common_english_words.txt"
+
+# where saved word counts are kept, and how big that directory may grow before
+# the least recently used entries are removed
+CACHE_DIR = pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache")) / "word_count"
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# the subdirectory of the cache holding get_word_counts_incremental()'s
+# state, which is evicted separately from the cached counts
+INCREMENTAL_DIR_NAME = "incremental"
 
 
 def get_file_name():
@@ -29,61 +84,726 @@ def get_file_name():
             return pathlib.Path(__file__).parent / file
 
 
-def get_word_counts(text: str) -> Dict[str, int]:
-    """Count the occurances of words in the text."""
+@functools.lru_cache(maxsize=None)
+def _load_stopwords(file: str) -> FrozenSet[str]:
+    """Read a stopword file once, later calls get the cached set."""
+    with open(file, "r") as in_file:
+        return frozenset(word for word in (line.strip().lower() for line in in_file) if word)
+
+
+def load_stopwords(file=STOPWORDS_FILE) -> FrozenSet[str]:
+    """Return the set of words in a stopword file (one word per line).
+
+    Each file is only read the first time it is asked for. Words are
+    lower-cased to match tokenize()."""
+    return _load_stopwords(os.path.abspath(file))
+
+
+def tokenize(text: str) -> List[str]:
+    """Strip punctuation from the text, lower-case it, and split it into words."""
     # remove all punctuation
-    text = text.translate(str.maketrans("", "", punctuation))
+    text = text.translate(PUNCTUATION_TABLE)
 
     # naively tokenize text
-    words = text.lower().split()
+    return text.lower().split()
+
+
+def sort_word_counts(word_counts: Dict[str, int]) -> Dict[str, int]:
+    """Order the word counts from most to least common.
+
+    The sort is stable, so words with the same count keep the order in which
+    they were first seen."""
+    return {k: v for k, v in sorted(word_counts.items(), reverse=True, key=lambda item: item[1])}
+
+
+def get_word_counts(
+    text: str, sort: bool = True, stopwords: Container[str] = frozenset()
+) -> Dict[str, int]:
+    """Count the occurances of words in the text.
+
+    If sort is False the counts are left in the order the words were first
+    seen, which saves a full sort when only the top few are needed (see
+    top_words()). Words in stopwords are not counted at all."""
+    words = tokenize(text)
 
     word_counts: Dict[str, int] = {}
 
     for word in words:
-        word_counts[word] = word_counts.get(word, 0) + 1
+        if word not in stopwords:
+            word_counts[word] = word_counts.get(word, 0) + 1
+
+    return sort_word_counts(word_counts) if sort else word_counts
+
+
+def align_chunks(pieces: Iterable[str]) -> Iterator[str]:
+    """Re-cut a sequence of text pieces so that each one ends on whitespace.
+
+    No word is ever split between two of the pieces yielded. The partial word
+    at the end of a piece is carried over and prepended to the next one; the
+    carried pieces are only joined once whitespace turns up, so a long run
+    without any (e.g., base64 data) isn't copied again for every piece."""
+    carry: List[str] = []
+
+    for chunk in pieces:
+        # find the last whitespace character, everything after it may be the
+        # beginning of a word that continues in the next chunk
+        match = LAST_WHITESPACE_REGEX.search(chunk)
+        if match is None:
+            carry.append(chunk)
+            continue
+
+        cut = match.end()
+        carry.append(chunk[:cut])
+        yield "".join(carry)
+        carry = [chunk[cut:]]
+
+    rest = "".join(carry)
+    if rest:
+        yield rest
+
+
+def read_chunks(in_file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Read the file in whitespace-aligned pieces of roughly chunk_size characters."""
+    return align_chunks(iter(lambda: in_file.read(chunk_size), ""))
+
+
+def get_word_counts_streaming(
+    file,
+    chunk_size: int = CHUNK_SIZE,
+    encoding=None,
+    sort: bool = True,
+    stopwords: Container[str] = frozenset(),
+) -> Dict[str, int]:
+    """Count the occurances of words in a file without reading all of it.
+
+    Only one chunk of the file is held in memory at a time, so memory use is
+    bounded by chunk_size and the size of the vocabulary rather than the size
+    of the file. The result is identical to get_word_counts(in_file.read())."""
+    word_counts: Counter = Counter()
+
+    with open(file, "r", encoding=encoding) as in_file:
+        for chunk in read_chunks(in_file, chunk_size):
+            word_counts.update(_without(tokenize(chunk), stopwords))
+
+    return sort_word_counts(word_counts) if sort else dict(word_counts)
+
+
+def _without(words: List[str], stopwords: Container[str]) -> Iterable[str]:
+    """Drop the stopwords from a list of words."""
+    if not stopwords:
+        return words
+    return [word for word in words if word not in stopwords]
+
+
+def _decode_word_counts(byte_counts: Dict[bytes, int]) -> Counter:
+    """Turn counts of byte-string tokens into counts of words.
+
+    ASCII tokens are already lower-case words. Other tokens are decoded as
+    UTF-8, lower-cased, and split again on any Unicode whitespace, which gives
+    the same words tokenize() would have found in the decoded text."""
+    word_counts: Counter = Counter()
+
+    for token, count in byte_counts.items():
+        if token.isascii():
+            word_counts[token.decode("ascii")] += count
+        else:
+            for word in token.decode("utf-8").lower().split():
+                word_counts[word] += count
+
+    return word_counts
+
+
+def get_word_counts_mmap(
+    file,
+    chunk_size: int = MMAP_CHUNK_SIZE,
+    sort: bool = True,
+    stopwords: Container[str] = frozenset(),
+) -> Dict[str, int]:
+    """Count the occurances of words in a UTF-8 file without decoding it.
+
+    The file is memory-mapped and tokenized as bytes: bytes.translate() strips
+    punctuation and lower-cases ASCII letters, bytes.split() breaks it into
+    tokens, and only the distinct tokens are decoded at the end. The result
+    is identical to get_word_counts_streaming(file, encoding="utf-8")."""
+    byte_counts: Counter = Counter()
+
+    with open(file, "rb") as in_file:
+        if os.fstat(in_file.fileno()).st_size == 0:
+            return {}
+
+        with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            carry = b""
+
+            for start in range(0, len(mapped), chunk_size):
+                chunk = mapped[start : start + chunk_size].translate(BYTES_TABLE, PUNCTUATION_BYTES)
+                if not chunk:
+                    continue
+                tokens = chunk.split()
+
+                # join the end of the last chunk onto the start of this one,
+                # without copying the whole chunk to do it
+                if carry:
+                    if tokens and chunk[0] not in WHITESPACE_BYTES:
+                        tokens[0] = carry + tokens[0]
+                    else:
+                        tokens.insert(0, carry)
+
+                # the last token may continue in the next chunk
+                if tokens and chunk[-1] not in WHITESPACE_BYTES:
+                    carry = tokens.pop()
+                else:
+                    carry = b""
+
+                byte_counts.update(tokens)
+
+            if carry:
+                byte_counts[carry] += 1
+
+    word_counts = _decode_word_counts(byte_counts)
+    if stopwords:
+        word_counts = Counter({word: n for word, n in word_counts.items() if word not in stopwords})
+
+    return sort_word_counts(word_counts) if sort else dict(word_counts)
+
+
+def _next_boundary(in_file: BinaryIO, offset: int) -> int:
+    """Return the first offset at or after 'offset' that follows a whitespace byte."""
+    if offset == 0:
+        return 0
+
+    # each block read starts at offset - 1
+    in_file.seek(offset - 1)
+    while True:
+        block = in_file.read(4096)
+        if not block:
+            return in_file.tell()
+        for i, byte in enumerate(block):
+            if byte in WHITESPACE_BYTES:
+                return offset + i
+        offset += len(block)
+
+
+def split_byte_ranges(file, parts: int) -> List[Tuple[int, int]]:
+    """Split a file into at most 'parts' byte ranges of roughly equal size.
+
+    Every range starts just after a whitespace byte, so no word is split
+    between two ranges. Empty ranges are dropped."""
+    size = os.path.getsize(file)
+    parts = max(1, min(parts, size))
+
+    with open(file, "rb") as in_file:
+        starts = [_next_boundary(in_file, size * n // parts) for n in range(parts)]
+
+    starts.append(size)
+    return [(start, end) for start, end in zip(starts, starts[1:]) if start < end]
+
+
+def _read_byte_range(file, start: int, end: int, encoding: str, chunk_size: int) -> Iterator[str]:
+    """Read and decode bytes start through end - 1 of the file, a piece at a time."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+
+    with open(file, "rb") as in_file:
+        in_file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = in_file.read(min(chunk_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield decoder.decode(block)
+
+    yield decoder.decode(b"", final=True)
+
+
+def _count_byte_range(job: Tuple[str, int, int, str, int, FrozenSet[str]]) -> Counter:
+    """Count the words in one byte range of a file (run in a worker process)."""
+    file, start, end, encoding, chunk_size, stopwords = job
+    word_counts: Counter = Counter()
+
+    pieces = _read_byte_range(file, start, end, encoding, chunk_size)
+    for chunk in align_chunks(pieces):
+        # the text layer would have turned \r\n into \n; both are whitespace
+        # so this makes no difference to the words found
+        word_counts.update(_without(tokenize(chunk), stopwords))
+
+    return word_counts
+
+
+def _merge_counts(partial_counts: Iterable[Dict[str, int]]) -> Counter:
+    """Add up partial word counts.
+
+    The partial counts must be given in file order; words are then added in
+    the order they first appear, which keeps ties in the same order as a
+    serial count."""
+    word_counts: Counter = Counter()
+
+    for counts in partial_counts:
+        word_counts.update(counts)
+
+    return word_counts
+
+
+def get_word_counts_parallel(
+    files,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    encoding: Optional[str] = None,
+    sort: bool = True,
+    stopwords: Container[str] = frozenset(),
+) -> Dict[str, int]:
+    """Count the occurances of words in one or more files using several processes.
+
+    Each file is split into byte ranges that start on whitespace, the ranges
+    are counted in a pool of 'workers' processes (default: one per CPU), and the
+    partial counts are merged in file order. The result is identical to
+    counting the files one after another with get_word_counts_streaming().
+
+    The encoding must be ASCII-compatible (UTF-8, Latin-1, ...) so that a
+    whitespace byte can never be part of a multi-byte character."""
+    if isinstance(files, (str, os.PathLike)):
+        files = [files]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if encoding is None:
+        encoding = locale.getpreferredencoding(False)
 
-    x = word_counts
+    stopwords = frozenset(stopwords)
 
-    new_dict = {k: v for k, v in sorted(x.items(), reverse=True, key=lambda item: item[1])}
+    jobs = [
+        (str(file), start, end, encoding, chunk_size, stopwords)
+        for file in files
+        for start, end in split_byte_ranges(file, workers)
+    ]
 
-    return new_dict
+    if workers == 1 or len(jobs) <= 1:
+        # not worth starting a pool
+        word_counts = _merge_counts(map(_count_byte_range, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            word_counts = _merge_counts(pool.map(_count_byte_range, jobs))
 
+    return sort_word_counts(word_counts) if sort else dict(word_counts)
 
-def pretty_print(words: Dict[str, int], count: int = 25, filtered=True):
-    """Print 'count' most common words in the file."""
+
+def top_words(
+    words: Dict[str, int], count: int = 25, exclude: Container[str] = ()
+) -> List[Tuple[str, int]]:
+    """Return the 'count' most common words and their counts, most common first.
+
+    Uses a heap of size 'count' rather than sorting the whole vocabulary, so it
+    runs in O(n log count) time. Ties are broken by the order of 'words', just
+    as they are by sort_word_counts(). Words in 'exclude' are skipped."""
+    if exclude:
+        items: Iterable[Tuple[str, int]] = (item for item in words.items() if item[0] not in exclude)
+    else:
+        items = words.items()
+
+    return heapq.nlargest(count, items, key=lambda item: item[1])
+
+
+def _file_digest(file) -> str:
+    """Return the SHA-256 hash of the file's contents."""
+    digest = hashlib.sha256()
+
+    with open(file, "rb") as in_file:
+        for block in iter(lambda: in_file.read(CHUNK_SIZE), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _cache_entry_path(file, stopwords: Container[str], cache_dir) -> pathlib.Path:
+    """Return the cache file used for this text file and set of stopwords."""
+    key = hashlib.sha256(os.path.abspath(file).encode())
+    for word in sorted(stopwords):
+        key.update(b"\0" + word.encode())
+
+    return pathlib.Path(cache_dir) / f"{key.hexdigest()}.json"
+
+
+def _write_json(path: pathlib.Path, data: Dict):
+    """Save data as JSON, writing to a temporary file first so a reader never sees half of it."""
+    os.makedirs(path.parent, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temp_path, "w") as out_file:
+        json.dump(data, out_file, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def _evict_cache(cache_dir, max_bytes: int):
+    """Remove the least recently used cache entries until the cache fits in max_bytes."""
+    entries = []
+    for entry in pathlib.Path(cache_dir).glob("*.json"):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry))
+
+    total = sum(size for _, size, _ in entries)
+
+    # oldest first
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def get_word_counts_cached(
+    file,
+    stopwords: Container[str] = frozenset(),
+    sort: bool = True,
+    cache_dir=CACHE_DIR,
+    max_cache_bytes: int = CACHE_MAX_BYTES,
+) -> Dict[str, int]:
+    """Count the occurances of words in a file, reusing counts saved by an earlier run.
+
+    Saved counts are used if the file's size and modification time are
+    unchanged, or if they changed but its contents still have the same
+    SHA-256 hash. Otherwise the file is counted with
+    get_word_counts_streaming() and the counts saved as JSON in cache_dir,
+    removing the least recently used entries if the directory grows past
+    max_cache_bytes."""
+    stat = os.stat(file)
+    entry_path = _cache_entry_path(file, stopwords, cache_dir)
+
+    try:
+        with open(entry_path, "r") as entry_file:
+            entry = json.load(entry_file)
+    except (FileNotFoundError, ValueError):
+        entry = None
+
+    digest = None
+    if entry is not None:
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            # mark the entry as recently used, unless another process
+            # evicted it since it was read
+            try:
+                os.utime(entry_path)
+            except FileNotFoundError:
+                pass
+            word_counts = entry["counts"]
+            return sort_word_counts(word_counts) if sort else word_counts
+
+        digest = _file_digest(file)
+        if entry["sha256"] == digest:
+            # same contents, e.g., after a touch: save the new size and
+            # modification time so later runs don't hash the file again
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            _write_json(entry_path, entry)
+            word_counts = entry["counts"]
+            return sort_word_counts(word_counts) if sort else word_counts
+
+    if digest is None:
+        digest = _file_digest(file)
+
+    word_counts = get_word_counts_streaming(file, sort=False, stopwords=stopwords)
+
+    entry = {
+        "path": os.path.abspath(file),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest,
+        "counts": word_counts,
+    }
+
+    _write_json(entry_path, entry)
+    _evict_cache(cache_dir, max_cache_bytes)
+
+    return sort_word_counts(word_counts) if sort else word_counts
+
+
+def _last_boundary(in_file: BinaryIO, start: int, end: int) -> int:
+    """Return the offset just after the last whitespace byte between start and end.
+
+    Returns start if there is no whitespace in that range."""
+    while end > start:
+        block_start = max(start, end - 4096)
+        in_file.seek(block_start)
+        block = in_file.read(end - block_start)
+        for i in range(len(block) - 1, -1, -1):
+            if block[i] in WHITESPACE_BYTES:
+                return block_start + i + 1
+        end = block_start
+
+    return start
+
+
+def _prefix_check(in_file: BinaryIO, offset: int) -> str:
+    """Hash the 4 KiB before offset, used to tell that a file was appended to rather than rewritten."""
+    start = max(0, offset - 4096)
+    in_file.seek(start)
+    return hashlib.sha256(in_file.read(offset - start)).hexdigest()
+
+
+def get_word_counts_incremental(
+    file,
+    stopwords: Container[str] = frozenset(),
+    sort: bool = True,
+    encoding: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    cache_dir=CACHE_DIR,
+    max_cache_bytes: int = CACHE_MAX_BYTES,
+) -> Dict[str, int]:
+    """Count the occurances of words in a file that grows over time.
+
+    The counts and the byte offset they cover are saved in the "incremental"
+    directory inside cache_dir, apart from get_word_counts_cached()'s
+    entries, and the least recently used are removed if that directory grows
+    past max_cache_bytes. On the next call only the bytes appended since then
+    are read. If the file was replaced, truncated or rewritten (its inode
+    changed, it shrank, or the 4 KiB before the saved offset differ) it is
+    counted again from the start.
+
+    Counting stops at the last whitespace in the file, since the last word
+    may not be finished yet; that word is included in the result but not in
+    the saved counts. As with get_word_counts_parallel() the encoding must
+    be ASCII-compatible."""
+    if encoding is None:
+        encoding = locale.getpreferredencoding(False)
+
+    stopwords = frozenset(stopwords)
+    state_dir = pathlib.Path(cache_dir) / INCREMENTAL_DIR_NAME
+    state_path = _cache_entry_path(file, stopwords, state_dir)
+
+    try:
+        with open(state_path, "r") as state_file:
+            state = json.load(state_file)
+    except (FileNotFoundError, ValueError):
+        state = None
+
+    with open(file, "rb") as in_file:
+        stat = os.fstat(in_file.fileno())
+
+        offset = 0
+        word_counts: Counter = Counter()
+        if (
+            state is not None
+            and state["inode"] == stat.st_ino
+            and state["offset"] <= stat.st_size
+            and state["check"] == _prefix_check(in_file, state["offset"])
+        ):
+            offset = state["offset"]
+            word_counts.update(state["counts"])
+
+        end = _last_boundary(in_file, offset, stat.st_size)
+        if end > offset:
+            word_counts.update(_count_byte_range((str(file), offset, end, encoding, chunk_size, stopwords)))
+
+        if end != offset or offset == 0:
+            _write_json(
+                state_path,
+                {
+                    "path": os.path.abspath(file),
+                    "inode": stat.st_ino,
+                    "offset": end,
+                    "check": _prefix_check(in_file, end),
+                    "counts": word_counts,
+                },
+            )
+            _evict_cache(state_dir, max_cache_bytes)
+        else:
+            # nothing new to save; mark the state as recently used instead
+            try:
+                os.utime(state_path)
+            except FileNotFoundError:
+                pass
+
+    if end < stat.st_size:
+        word_counts.update(_count_byte_range((str(file), end, stat.st_size, encoding, chunk_size, stopwords)))
+
+    return sort_word_counts(word_counts) if sort else dict(word_counts)
+
+
+def pretty_print(
+    words: Dict[str, int],
+    count: int = 25,
+    filtered=True,
+    stopwords_file=STOPWORDS_FILE,
+    counted_without: FrozenSet[str] = frozenset(),
+):
+    """Print 'count' most common words in the file.
+
+    If filtered is True the words in stopwords_file are left out. If the
+    counts were made without those same words (counted_without), they are
+    already filtered and are not checked again."""
     out = f"\nThe {count} most common words in the file"
     if filtered:
         out += ", excepting the\n100 most common English words,"
     out += " are:\n"
     print(out)
 
-    word_list = [word for word in words.keys()]
+    common_words: FrozenSet[str] = frozenset()
 
     if filtered:
-        with open(pathlib.Path(__file__).parent / "most_common_english_words.txt", "r") as in_file:
-            common_words = [line.strip() for line in in_file]
+        common_words = load_stopwords(stopwords_file)
+        if common_words == counted_without:
+            common_words = frozenset()
 
-        word_list = [word for word in word_list if word not in common_words]
+    word_list = [word for word, _ in top_words(words, count, common_words)]
 
-    for n in range(count):
+    for n in range(len(word_list)):
         print(f"{word_list[n]:<15}", end="")
 
         if (n + 1) % 5 == 0:
             print()
 
 
+def expand_paths(patterns: Iterable[str]) -> List[str]:
+    """Expand glob patterns into a list of files, keeping their order and dropping duplicates."""
+    files: Dict[str, None] = {}
+
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for match in matches:
+            if not os.path.isdir(match):
+                files[match] = None
+
+    return list(files)
+
+
+def _count_file(job: Tuple[str, FrozenSet[str], bool, bool]) -> Dict[str, int]:
+    """Count the words in one file for batch mode (run in a worker process)."""
+    file, stopwords, use_cache, incremental = job
+
+    if incremental:
+        return get_word_counts_incremental(file, stopwords=stopwords, sort=False)
+    if use_cache:
+        return get_word_counts_cached(file, stopwords=stopwords, sort=False)
+    return get_word_counts_streaming(file, stopwords=stopwords, sort=False)
+
+
+def count_files(
+    files: List[str],
+    stopwords: Container[str] = frozenset(),
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    incremental: bool = False,
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, int]]:
+    """Count the words in each file, several files at a time.
+
+    Returns the (unsorted) counts for each file and the counts for all of the
+    files added together. With incremental, files are counted with
+    get_word_counts_incremental() so only text appended since the last run
+    is read."""
+    jobs = [(file, frozenset(stopwords), use_cache, incremental) for file in files]
+
+    if workers == 1 or len(jobs) <= 1:
+        results = list(map(_count_file, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_count_file, jobs))
+
+    per_file = dict(zip(files, results))
+    total = dict(_merge_counts(results))
+
+    return per_file, total
+
+
+def write_report(
+    per_file: Dict[str, Dict[str, int]],
+    total: Dict[str, int],
+    out_file: TextIO,
+    count: int = 25,
+    output_format: str = "json",
+):
+    """Write the 'count' most common words of each file and of all files as JSON or CSV."""
+    reports = {file: top_words(counts, count) for file, counts in per_file.items()}
+    overall = top_words(total, count)
+
+    if output_format == "csv":
+        writer = csv.writer(out_file)
+        writer.writerow(["file", "rank", "word", "count"])
+        for file, words in list(reports.items()) + [("*", overall)]:
+            for rank, (word, word_count) in enumerate(words, start=1):
+                writer.writerow([file, rank, word, word_count])
+    else:
+        json.dump(
+            {
+                "files": {
+                    file: [{"word": word, "count": n} for word, n in words]
+                    for file, words in reports.items()
+                },
+                "total": [{"word": word, "count": n} for word, n in overall],
+            },
+            out_file,
+            indent=2,
+        )
+        out_file.write("\n")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse the command line for batch mode."""
+    parser = argparse.ArgumentParser(
+        description="Count the most common words in text files. "
+        "With no files, choose a book from a menu instead."
+    )
+    parser.add_argument("paths", nargs="+", help="files or glob patterns to count")
+    parser.add_argument("-n", "--top", type=int, default=25, help="number of words to report (default: 25)")
+    parser.add_argument("-f", "--format", choices=["json", "csv"], default="json", help="output format")
+    parser.add_argument("-o", "--output", help="file to write the report to (default: standard output)")
+    parser.add_argument("-w", "--workers", type=int, help="number of processes (default: one per CPU)")
+    parser.add_argument("--stopwords", default=STOPWORDS_FILE, help="file of words to leave out")
+    parser.add_argument("--no-filter", action="store_true", help="do not leave out any words")
+    parser.add_argument("--no-cache", action="store_true", help="do not use saved counts")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only read text appended since the last run (for growing files; not with --no-cache)",
+    )
+
+    args = parser.parse_args(argv)
+    args.files = expand_paths(args.paths)
+
+    missing = [file for file in args.files if not os.path.isfile(file)]
+    if missing:
+        parser.error(f"no such file: {', '.join(missing)}")
+
+    if not args.no_filter and not os.path.isfile(args.stopwords):
+        parser.error(f"no such stopwords file: {args.stopwords}")
+
+    if args.incremental and args.no_cache:
+        parser.error("--incremental saves counts between runs, so it can't be used with --no-cache")
+
+    return args
+
+
+def run_batch(argv: List[str]):
+    """Count the files named on the command line and write a report."""
+    args = parse_args(argv)
+
+    stopwords = frozenset() if args.no_filter else load_stopwords(args.stopwords)
+    per_file, total = count_files(args.files, stopwords, args.workers, not args.no_cache, args.incremental)
+
+    if args.output:
+        with open(args.output, "w", newline="") as out_file:
+            write_report(per_file, total, out_file, args.top, args.format)
+    else:
+        write_report(per_file, total, sys.stdout, args.top, args.format)
+
+
 def main():
     """Run the program."""
+    if len(sys.argv) > 1:
+        run_batch(sys.argv[1:])
+        return
+
     file = get_file_name()
-    with open(file, "r") as in_file:
-        try:
-            text = in_file.read()
-        except IOError as err:
-            print("*** Error reading file ***")
-            print(err.__cause__)
-        else:
-            word_counts = get_word_counts(text)
-            pretty_print(word_counts)
+    stopwords = load_stopwords()
+    try:
+        word_counts = get_word_counts_cached(file, sort=False, stopwords=stopwords)
+    except IOError as err:
+        print("*** Error reading file ***")
+        print(err)
+    else:
+        pretty_print(word_counts, counted_without=stopwords)
 
 
 if __name__ == "__main__":
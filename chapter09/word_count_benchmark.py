@@ -0,0 +1,227 @@
+#! /usr/bin/env python3.8
+"""Benchmark and profile word_count.py.
+
+Generates a synthetic corpus, then times each stage of counting words
+(read, translate, split, count, sort, filter, print) and each of the
+whole-file counting functions. Every timing is the best of several repeats,
+and the corpus is generated from a fixed seed, so numbers from two revisions
+of word_count.py can be compared directly (use --json to save them).
+"""
+
+from typing import Callable, Dict, List, Tuple
+import argparse
+import contextlib
+import cProfile
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import pstats
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import word_count
+
+
+def make_corpus(file, size: int, vocabulary: int = 50_000, seed: int = 161):
+    """Write about 'size' bytes of random text drawn from 'vocabulary' distinct words.
+
+    Word frequencies follow Zipf's law, as they do in real text, and about
+    one word in ten has punctuation attached."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    words = []
+    for n in range(vocabulary):
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(2, 10)))
+        words.append(word.capitalize() if n % 7 == 0 else word)
+
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, vocabulary + 1)))
+    marks = [",", ".", ";", "!", "?", "'s", '"']
+
+    with open(file, "w") as out_file:
+        written = 0
+        while written < size:
+            line = []
+            for word in rng.choices(words, cum_weights=cum_weights, k=12):
+                if rng.random() < 0.1:
+                    word += rng.choice(marks)
+                line.append(word)
+            text = " ".join(line) + "\n"
+            out_file.write(text)
+            written += len(text)
+
+
+def best_time(function: Callable, repeat: int) -> Tuple[float, object]:
+    """Return the shortest of 'repeat' run times of function and its result."""
+    best = float("inf")
+    result = None
+
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    return best, result
+
+
+def peak_memory(function: Callable) -> int:
+    """Return the most memory, in bytes, allocated at once while function runs."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stages(file) -> List[Tuple[str, Callable]]:
+    """Return the stages of get_word_counts() and pretty_print() as separate steps.
+
+    Each stage works on the output of the one before it, which is computed
+    once up front so only the stage itself is timed."""
+
+    def read():
+        with open(file, "r") as in_file:
+            return in_file.read()
+
+    text = read()
+    translated = text.translate(word_count.PUNCTUATION_TABLE)
+    words = translated.lower().split()
+
+    def count():
+        word_counts: Dict[str, int] = {}
+        for word in words:
+            word_counts[word] = word_counts.get(word, 0) + 1
+        return word_counts
+
+    word_counts = count()
+    sorted_counts = word_count.sort_word_counts(word_counts)
+    stopwords = word_count.load_stopwords()
+
+    def print_():
+        with contextlib.redirect_stdout(io.StringIO()):
+            word_count.pretty_print(word_counts)
+
+    return [
+        ("read", read),
+        ("translate", lambda: text.translate(word_count.PUNCTUATION_TABLE)),
+        ("split", lambda: translated.lower().split()),
+        ("count", count),
+        ("sort", lambda: word_count.sort_word_counts(word_counts)),
+        ("filter", lambda: [word for word in sorted_counts if word not in stopwords]),
+        ("print", print_),
+    ]
+
+
+def engines(file, workers: int) -> List[Tuple[str, Callable]]:
+    """Return the functions that count a whole file."""
+
+    def whole_file():
+        with open(file, "r") as in_file:
+            return word_count.get_word_counts(in_file.read())
+
+    return [
+        ("get_word_counts", whole_file),
+        ("streaming", lambda: word_count.get_word_counts_streaming(file)),
+        ("mmap", lambda: word_count.get_word_counts_mmap(file)),
+        # the same with chunks as big as the streaming engine's, to show what
+        # the smaller default saves in peak memory
+        ("mmap (1 MiB chunks)", lambda: word_count.get_word_counts_mmap(file, chunk_size=word_count.CHUNK_SIZE)),
+        (f"parallel ({workers} workers)", lambda: word_count.get_word_counts_parallel(file, workers=workers)),
+    ]
+
+
+def run(file, repeat: int, workers: int, memory: bool) -> Dict:
+    """Time every stage and engine, returning the results."""
+    size = os.path.getsize(file)
+    results: Dict = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "file_bytes": size,
+        "stages": {},
+        "engines": {},
+    }
+
+    for group, steps in (("stages", stages(file)), ("engines", engines(file, workers))):
+        for name, function in steps:
+            seconds, _ = best_time(function, repeat)
+            result = {"seconds": seconds, "mb_per_second": size / seconds / 1e6 if seconds else None}
+            if memory and not name.startswith("parallel"):
+                result["peak_bytes"] = peak_memory(function)
+            results[group][name] = result
+
+    return results
+
+
+def print_results(results: Dict):
+    """Print the results as a table."""
+    print(f"\nPython {results['python']} on {results['machine']}, {results['file_bytes']:,} byte corpus\n")
+    print(f"{'':<26}{'seconds':>10}{'MB/s':>10}{'peak MB':>10}")
+
+    for group in ("stages", "engines"):
+        print(f"{group}:")
+        for name, result in results[group].items():
+            peak = result.get("peak_bytes")
+            peak_text = f"{peak / 1e6:>10.1f}" if peak is not None else f"{'-':>10}"
+            print(f"  {name:<24}{result['seconds']:>10.4f}{result['mb_per_second']:>10.1f}{peak_text}")
+
+
+def profile(file, out_file, sort_by: str = "cumulative"):
+    """Run get_word_counts_streaming() and pretty_print() under cProfile.
+
+    The statistics are saved to out_file, which can be read with pstats or
+    a viewer such as snakeviz, and the top of the report is printed."""
+    profiler = cProfile.Profile()
+    with contextlib.redirect_stdout(io.StringIO()):
+        profiler.runcall(lambda: word_count.pretty_print(word_count.get_word_counts_streaming(file)))
+    profiler.dump_stats(out_file)
+
+    pstats.Stats(out_file).sort_stats(sort_by).print_stats(15)
+
+
+def main():
+    """Run the program."""
+    parser = argparse.ArgumentParser(description="Benchmark word_count.py.")
+    parser.add_argument("file", nargs="?", help="text file to use (default: generate one)")
+    parser.add_argument("-s", "--size", type=float, default=20, help="size of the generated corpus in MB")
+    parser.add_argument("-v", "--vocabulary", type=int, default=50_000, help="distinct words in the corpus")
+    parser.add_argument("--seed", type=int, default=161, help="random seed for the corpus")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="runs of each step, the best is kept")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="processes for parallel")
+    parser.add_argument("--no-memory", action="store_true", help="skip measuring peak memory")
+    parser.add_argument("--json", help="also save the results to this file")
+    parser.add_argument("--profile", help="save cProfile statistics to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file = args.file
+        if file is None:
+            file = os.path.join(temp_dir, "corpus.txt")
+            make_corpus(file, int(args.size * 1e6), args.vocabulary, args.seed)
+
+        results = run(file, args.repeat, args.workers, not args.no_memory)
+        print_results(results)
+
+        if args.json:
+            with open(args.json, "w") as out_file:
+                json.dump(results, out_file, indent=2)
+
+        if args.profile:
+            profile(file, args.profile)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())